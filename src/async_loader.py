@@ -0,0 +1,161 @@
+import asyncio
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import project_crawler
+import file_walker
+
+# how many directory listings and file reads can be waiting on the file system
+# at once. each one is a thread that spends nearly all of its time blocked, so
+# this can be a lot higher than the number of cores.
+LOAD_CONCURRENCY = 32
+
+profile = project_crawler.profile
+
+class LocalFileSystem:
+    # everything the loader asks of the file system, so that something slower or
+    # further away can stand in for it.
+    def list_dir(self, path) -> list[tuple[str, bool, bool]]:
+        entries = list()
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    is_file = not is_dir and entry.is_file()
+                except OSError:
+                    continue
+                entries.append((entry.name, is_dir, is_file))
+        return entries
+
+    def read_file(self, path) -> tuple[bytes, os.stat_result]:
+        # the stat is of the file as it was read, for the report cache.
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            return f.read(), stat
+
+class AsyncLoader:
+    # finds and reads the project's files with many listings and reads in flight
+    # at once, so that on a slow file system the time spent waiting on each of
+    # them overlaps instead of adding up. the event loop only runs while the
+    # caller is asking for the next file, which keeps no more than concurrency
+    # files read ahead of whatever the caller is doing with them.
+    def __init__(self, fs=None, concurrency=LOAD_CONCURRENCY, jobs=1):
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+
+        self.fs = LocalFileSystem() if fs is None else fs
+        self.concurrency = concurrency
+        self.loop = asyncio.new_event_loop()
+        self.io_executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.parse_executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.io_executor.shutdown(cancel_futures=True)
+        if self.parse_executor is not None:
+            self.parse_executor.shutdown(cancel_futures=True)
+        self.loop.close()
+
+    def run_io(self, func, *args):
+        return self.loop.run_in_executor(self.io_executor, func, *args)
+
+    def read_gitignore(self, directory) -> list[file_walker.IgnoreRule]:
+        try:
+            ignore_data, stat = self.fs.read_file(os.path.join(directory, file_walker.GITIGNORE_FILE))
+        except OSError:
+            return list()
+        return file_walker.parse_gitignore(ignore_data.decode("utf-8", errors="replace"))
+
+    async def walk_directory(self, file_filter, root, current_dir, ignore_stack, names):
+        # the same decisions as FileFilter.walk, and the files come back in the same
+        # order, but every sub directory is listed at the same time.
+        try:
+            entries = await self.run_io(self.fs.list_dir, current_dir)
+        except OSError:
+            return list()
+        entries.sort(key=lambda e: e[0])
+
+        has_gitignore = any(name == file_walker.GITIGNORE_FILE for name, is_dir, is_file in entries)
+        if has_gitignore and file_filter.use_gitignore and current_dir not in file_filter.gitignores:
+            file_filter.gitignores[current_dir] = await self.run_io(self.read_gitignore, current_dir)
+        ignore_stack = file_filter.push_gitignore(ignore_stack, current_dir, has_gitignore)
+
+        files = list()
+        sub_dirs = list()
+        for name, is_dir, is_file in entries:
+            if names is not None and current_dir == root and name not in names:
+                continue
+            path = os.path.join(current_dir, name)
+            relative_path = path[len(root) + 1:].replace(os.sep, "/")
+            if is_dir:
+                if file_filter.accepts_directory(ignore_stack, path, relative_path, name):
+                    sub_dirs.append(path)
+            elif is_file:
+                if file_filter.accepts_file(ignore_stack, path, relative_path, name):
+                    files.append(path)
+
+        sub_files = await asyncio.gather(*(self.walk_directory(file_filter, root, sub_dir, ignore_stack, names) for sub_dir in sub_dirs))
+        for sub_dir_files in sub_files:
+            files.extend(sub_dir_files)
+        return files
+
+    def find_project_files(self, project_root=project_crawler.PROJECT_ROOT, file_filter=None, search=project_crawler.SEARCH) -> list[str]:
+        if file_filter is None:
+            file_filter = file_walker.FileFilter()
+        root = os.path.abspath(project_root)
+        with profile.phase("walk"):
+            if os.path.isfile(root):
+                return list(file_filter.walk(root))
+            return self.loop.run_until_complete(self.walk_directory(file_filter, root, root, (), search))
+
+    async def load_file(self, file_path, cache=None):
+        file_data, stat = await self.run_io(self.fs.read_file, file_path)
+        with profile.phase("hash"):
+            file_hash = project_crawler.hash_file_data(file_data)
+
+        reports = None
+        if cache is not None:
+            reports = cache.lookup_hash(file_path, file_hash)
+        if reports is None:
+            if self.parse_executor is None:
+                # parsed on the loop's own thread, which is the caller's, while the
+                # reads already handed out carry on in the background.
+                reports = project_crawler.scan_buffer(file_path, file_data)
+            elif profile.enabled:
+                reports, snapshot = await self.loop.run_in_executor(self.parse_executor, project_crawler.profile_scan_buffer, file_path, file_data)
+                profile.merge(snapshot)
+            else:
+                reports = await self.loop.run_in_executor(self.parse_executor, project_crawler.scan_buffer, file_path, file_data)
+            if cache is not None:
+                cache.store(file_path, file_hash, reports, stat)
+
+        return file_path, reports, project_crawler.MappedFile(file_path, file_data, stat)
+
+    def iter_files(self, file_paths, cache=None):
+        # gives back each file's reports along with the contents they came from, so
+        # that nothing has to read the file a second time, in the order the files
+        # were given.
+        pending = deque()
+        file_paths = iter(file_paths)
+        try:
+            while True:
+                while len(pending) < self.concurrency:
+                    file_path = next(file_paths, None)
+                    if file_path is None:
+                        break
+                    pending.append(self.loop.create_task(self.load_file(file_path, cache)))
+                if len(pending) == 0:
+                    return
+                yield self.loop.run_until_complete(pending.popleft())
+        finally:
+            # the caller gave up early, so the reads still in flight are dropped.
+            for task in pending:
+                task.cancel()
+            if len(pending) > 0:
+                self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
@@ -0,0 +1,328 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+
+import project_crawler
+import async_loader
+import func_lister
+import main as gui
+
+# the slow file system the loader is tested against stands in for a network share
+# here too.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests"))
+from test_async_loader import SlowFileSystem
+
+@dataclass
+class CorpusSize:
+    directories: int
+    files: int
+    functions: int
+
+SIZES = {
+    "small": CorpusSize(directories=2, files=4, functions=8),
+    "medium": CorpusSize(directories=4, files=12, functions=24),
+    "huge": CorpusSize(directories=8, files=40, functions=48),
+}
+
+TOP_DIRECTORIES = ["core", "tekgl", "tekphys", "tekgui"]
+RETURN_TYPES = ["void", "int", "float", "exception", "tek_init", "uint", "char*"]
+PARAM_TYPES = ["int", "float", "uint", "char*", "const char*", "struct Vector", "const struct Matrix", "void*"]
+WORDS = ["vertex", "buffer", "shader", "body", "collider", "window", "matrix", "vector", "mesh", "entity", "font", "list", "queue", "stack"]
+
+BASELINE_FILE = "bench_baseline.json"
+THRESHOLD = 0.25
+
+def generate_name(rng, prefix):
+    return f"{prefix}{rng.choice(WORDS).capitalize()}{rng.choice(WORDS).capitalize()}"
+
+def generate_doxygen(rng, params, returns):
+    lines = ["/**", f" * @brief {" ".join(rng.choices(WORDS, k=rng.randint(4, 10)))}"]
+    if rng.random() < 0.3:
+        lines.append(f" * @note {" ".join(rng.choices(WORDS, k=rng.randint(3, 6)))}")
+    for param_type, param_name in params:
+        lines.append(f" * @param {param_name} The {param_name} to use.")
+    if returns == "exception":
+        lines.append(" * @throws Any error that occurs.")
+    elif returns not in ("void", "tek_init"):
+        lines.append(f" * @return The {rng.choice(WORDS)}.")
+    lines.append(" */")
+    return lines
+
+def generate_body(rng, callees):
+    lines = list()
+    for i in range(rng.randint(3, 30)):
+        roll = rng.random()
+        if roll < 0.15:
+            lines.append(f"    // {" ".join(rng.choices(WORDS, k=rng.randint(2, 8)))}")
+        elif roll < 0.2:
+            lines.append(f"    /* {" ".join(rng.choices(WORDS, k=rng.randint(2, 8)))} */")
+        elif roll < 0.45 and len(callees) > 0:
+            lines.append(f"    tekChainThrow({rng.choice(callees)}({rng.choice(WORDS)}, {rng.randint(0, 255)}));")
+        elif roll < 0.6:
+            lines.append(f"    if ({rng.choice(WORDS)} > {rng.random() * 100:.2f}f) {{")
+            lines.append(f"        printf(\"{rng.choice(WORDS)} %d\\n\", {rng.choice(WORDS)});")
+            lines.append("    }")
+        elif roll < 0.7:
+            lines.append(f"    for (uint i = 0; i < {rng.randint(1, 64)}; i++) {{")
+            lines.append(f"        {rng.choice(WORDS)}[i] = 0x{rng.randint(0, 0xFFFF):04X};")
+            lines.append("    }")
+        else:
+            lines.append(f"    const int {rng.choice(WORDS)} = {rng.randint(0, 1000)};")
+    return lines
+
+def generate_source(rng, size, prefix, known_functions):
+    lines = list()
+    header = list()
+
+    for i in range(rng.randint(1, 3)):
+        macro_name = f"{prefix.upper()}_{rng.choice(WORDS).upper()}_{i}"
+        header.append(f"#define {macro_name}(x, y) \\")
+        header.append("    ((x) > (y) ? (x) : (y))")
+        header.append("")
+
+    for i in range(rng.randint(1, 3)):
+        struct_name = f"{generate_name(rng, "")}{i}"
+        header.extend(generate_doxygen(rng, [], "void"))
+        if rng.random() < 0.5:
+            header.append(f"typedef struct {struct_name} {{ int {rng.choice(WORDS)}; float {rng.choice(WORDS)}; }} {struct_name};")
+        else:
+            header.append(f"struct {struct_name} {{ uint {rng.choice(WORDS)}; char* {rng.choice(WORDS)}; }};")
+        header.append("")
+
+    for i in range(size.functions):
+        function_name = f"{generate_name(rng, prefix)}{i}"
+        returns = rng.choice(RETURN_TYPES)
+        params = list()
+        for j in range(rng.randint(0, 4)):
+            params.append((rng.choice(PARAM_TYPES), f"{rng.choice(WORDS)}_{j}"))
+        signature = f"{returns} {function_name}({", ".join(f"{t} {n}" for t, n in params)})"
+
+        # leave some functions undocumented, so the checks have something to find.
+        if rng.random() < 0.8:
+            doxygen = generate_doxygen(rng, params, returns)
+            lines.extend(doxygen)
+            header.extend(doxygen)
+        header.append(f"{signature};")
+        header.append("")
+
+        callees = rng.sample(known_functions, min(len(known_functions), 6))
+        lines.append(f"{signature} {{")
+        lines.extend(generate_body(rng, callees))
+        lines.append("}")
+        lines.append("")
+        known_functions.append(function_name)
+
+    return "\n".join(lines), "\n".join(header)
+
+def generate_corpus(root, size_name="small", seed=0):
+    size = SIZES[size_name]
+    rng = random.Random(seed)
+    known_functions = list()
+
+    for top_directory in TOP_DIRECTORIES:
+        for i in range(size.directories):
+            directory = os.path.join(root, top_directory, f"{rng.choice(WORDS)}{i}")
+            os.makedirs(directory, exist_ok=True)
+            for j in range(size.files):
+                prefix = f"tek{top_directory.capitalize()}"
+                source, header = generate_source(rng, size, prefix, known_functions)
+                file_name = f"{rng.choice(WORDS)}_{j}"
+                project_crawler.write_file(os.path.join(directory, f"{file_name}.c"), source)
+                project_crawler.write_file(os.path.join(directory, f"{file_name}.h"), header)
+
+    main_lines = ["int main(int argc, char* argv[]) {"]
+    for function_name in rng.sample(known_functions, min(len(known_functions), 20)):
+        main_lines.append(f"    tekChainThrow({function_name}(argc, argv));")
+    main_lines.append("    return 0;")
+    main_lines.append("}")
+    project_crawler.write_file(os.path.join(root, "main.c"), "\n".join(main_lines))
+    project_crawler.write_file(os.path.join(root, "tekgl.h"), "#define TEK_GL_VERSION(major, minor) ((major) * 100 + (minor))\n")
+
+def time_call(func, repeat):
+    times = list()
+    result = None
+    for i in range(repeat):
+        start_time = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start_time)
+    return times, result
+
+def run_benchmarks(corpus_root, repeat=5, only=None):
+    results = dict()
+
+    def bench(name, func, items=None):
+        if only is not None and name not in only:
+            return None
+        times, result = time_call(func, repeat)
+        results[name] = {
+            "best": min(times),
+            "median": statistics.median(times),
+            "mean": statistics.fmean(times),
+            "repeat": repeat,
+        }
+        if items is not None:
+            results[name]["items"] = items
+        print(f"{name:<24}{min(times) * 1000:>12.2f}ms{statistics.median(times) * 1000:>12.2f}ms", file=sys.stderr)
+        return result
+
+    bench("generate_file_tree", lambda: project_crawler.list_files(project_crawler.generate_file_tree(corpus_root)))
+    bench("find_project_files", lambda: project_crawler.find_project_files(corpus_root))
+
+    file_paths = project_crawler.find_project_files(corpus_root)
+    file_data = [(file_path, project_crawler.read_file(file_path)) for file_path in file_paths]
+    num_lines = sum(data.count("\n") + 1 for file_path, data in file_data)
+
+    def scan_files():
+        return [report for file_path, data in file_data for report in project_crawler.scan_file(file_path, data)]
+
+    def report_files():
+        return [report for file_path in file_paths for report in project_crawler.get_file_reports(file_path)]
+
+    reports = scan_files()
+    bench("generate_function_report", scan_files, items=num_lines)
+    bench("get_file_reports", report_files, items=len(file_paths))
+
+    # the whole load over a slow file system, one listing or read at a time and
+    # then with as many in flight as the loader allows.
+    def load_slow(concurrency):
+        with async_loader.AsyncLoader(SlowFileSystem(), concurrency) as loader:
+            return [reports for file_path, reports, mapped in loader.iter_files(loader.find_project_files(corpus_root))]
+
+    bench("load slow fs serial", lambda: load_slow(1), items=len(file_paths))
+    bench("load slow fs async", lambda: load_slow(async_loader.LOAD_CONCURRENCY), items=len(file_paths))
+
+    # generate_function_list writes its json next to wherever it is run from.
+    bench("generate_function_list", lambda: project_crawler.generate_function_list(file_paths, blacklist_file=None), items=len(reports))
+
+    highlighter = gui.Highlighter()
+    highlighter.add_rule(gui.HighlighterMode.KEYWORD, gui.Colour.KEYWORD)
+    highlighter.add_rule(gui.HighlighterMode.TYPE, gui.Colour.TYPE)
+    highlighter.add_rule(gui.HighlighterMode.NUMBER, gui.Colour.NUMBER)
+    highlighter.add_rule(gui.HighlighterMode.STRING, gui.Colour.STRING)
+    highlighter.add_rule(gui.HighlighterMode.MACRO, gui.Colour.MACRO)
+    highlighter.add_rule(gui.HighlighterMode.COMMENT, gui.Colour.COMMENT)
+    bench("generate_tags", lambda: [highlighter.generate_tags(data) for file_path, data in file_data], items=num_lines)
+
+    # the checker is only ever given one function at a time, as in the Final Version panel.
+    file_lines = {file_path: data.split("\n") for file_path, data in file_data}
+    snippets = list()
+    for report in reports:
+        lines = file_lines[report.file][report.start_line:report.start_line + report.num_lines]
+        snippets.append((report.file, "\n".join(lines)))
+    bench("Checker.check", lambda: [gui.Checker(file_path, snippet).check() for file_path, snippet in snippets], items=len(snippets))
+
+    # func_lister only documents what has a doxygen block to work from.
+    functions = [report for report in reports if report.type == project_crawler.ReportType.FUNCTION and report.doxygen_lines > 0]
+    descriptions = bench("process_doxygen", lambda: [func_lister.process_doxygen(report, file_lines[report.file]) for report in functions], items=len(functions))
+    if descriptions is None:
+        descriptions = [func_lister.process_doxygen(report, file_lines[report.file]) for report in functions]
+    bench("create_document", lambda: func_lister.create_document(descriptions, "bench.odt"), items=len(descriptions))
+
+    # a cold run renders every section and a warm one should only hash the files.
+    def write_document(backend_name, document_cache):
+        with func_lister.DOCUMENT_BACKENDS[backend_name]("bench") as backend:
+            func_lister.write_document(file_paths, backend, document_cache=document_cache)
+
+    bench("write_document md", lambda: write_document("md", func_lister.DocumentCache("bench_document_cache.json")), items=len(file_paths))
+    document_cache = func_lister.DocumentCache("bench_document_cache.json")
+    write_document("md", document_cache)
+    bench("write_document md cached", lambda: write_document("md", document_cache), items=len(file_paths))
+
+    return results
+
+def load_results(file_path):
+    with open(file_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_results(file_path, results):
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+
+def compare_results(results, baseline, threshold=THRESHOLD) -> list[str]:
+    regressions = list()
+    print(f"{"benchmark":<24}{"baseline":>12}{"current":>12}{"change":>10}")
+    for name, result in results["results"].items():
+        baseline_result = baseline["results"].get(name)
+        if baseline_result is None:
+            print(f"{name:<24}{"-":>12}{result["best"] * 1000:>10.2f}ms{"new":>10}")
+            continue
+        change = result["best"] / baseline_result["best"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = " REGRESSION"
+        print(f"{name:<24}{baseline_result["best"] * 1000:>10.2f}ms{result["best"] * 1000:>10.2f}ms{change * 100:>+9.1f}%{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="TekPhysics Project Crawler Benchmarks",
+        description="Time the crawler, checker and document generation over a synthetic C project"
+    )
+    parser.add_argument("-s", "--size", choices=SIZES.keys(), default="small")
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default=None)
+    parser.add_argument("-b", "--baseline", default=BASELINE_FILE)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--save_baseline", action="store_true")
+    parser.add_argument("--only", nargs="+", default=None)
+    parser.add_argument("--corpus", default=None)
+
+    args = parser.parse_args()
+
+    baseline_path = os.path.abspath(args.baseline)
+    output_path = None if args.output is None else os.path.abspath(args.output)
+    working_dir = os.getcwd()
+
+    with tempfile.TemporaryDirectory(prefix="crawler_bench_") as temp_dir:
+        if args.corpus is None:
+            corpus_root = os.path.join(temp_dir, "project")
+            generate_corpus(corpus_root, args.size, args.seed)
+        else:
+            corpus_root = os.path.abspath(args.corpus)
+
+        # anything the benchmarks write ends up in the temporary directory.
+        os.chdir(temp_dir)
+        try:
+            results = {
+                "size": args.size if args.corpus is None else args.corpus,
+                "seed": args.seed,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "results": run_benchmarks(corpus_root, args.repeat, args.only),
+            }
+        finally:
+            os.chdir(working_dir)
+
+    if output_path is not None:
+        save_results(output_path, results)
+
+    if args.save_baseline:
+        save_results(baseline_path, results)
+        return 0
+
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path}, run with --save_baseline to record one.")
+        return 0
+
+    baseline = load_results(baseline_path)
+    if baseline.get("size") != results["size"]:
+        print(f"Baseline was recorded for {baseline.get("size")}, not {results["size"]}.")
+    regressions = compare_results(results, baseline, args.threshold)
+    if len(regressions) > 0:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold * 100:.0f}%: {", ".join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
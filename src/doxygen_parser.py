@@ -0,0 +1,160 @@
+import hashlib
+import re
+from dataclasses import dataclass
+
+import project_crawler
+
+COMMENT_CACHE_SIZE = 1 << 14
+
+# a tag, with an optional direction or other option in square brackets, and
+# whatever follows it on the same line.
+tag_pattern = re.compile(r"[@\\](\w+)(?:\[([^\]]*)\])?\s*(.*)")
+
+PARAM_TAGS = frozenset(("param", "tparam"))
+RETURN_TAGS = frozenset(("return", "returns", "retval"))
+THROW_TAGS = frozenset(("throws", "throw", "exception"))
+
+@dataclass(frozen=True, slots=True)
+class DoxygenComment:
+    # shared between everything that parsed the same comment, so never changed
+    # once made.
+    num_lines: int
+    brief: str
+    details: str
+    notes: tuple[str, ...]
+    params: dict[str, str]
+    returns: str | None
+    throws: tuple[str, ...]
+
+    @property
+    def description(self) -> str:
+        parts = [self.brief, self.details]
+        parts.extend(f"NOTE: {note}" for note in self.notes)
+        return " ".join(part for part in parts if part != "")
+
+def strip_decoration(line) -> str:
+    # block comments (/** and /*!) and line comments (/// and //!) alike.
+    line = line.strip()
+    if line.startswith("///") or line.startswith("//!"):
+        return line[3:].strip()
+    if line.startswith("/**") or line.startswith("/*!"):
+        line = line[3:]
+    if line.endswith("*/"):
+        line = line[:-2]
+    line = line.strip()
+    if line.startswith("*"):
+        line = line[1:]
+    return line.strip()
+
+def join_text(lines) -> str:
+    return " ".join(lines)
+
+def parse_lines(lines) -> DoxygenComment:
+    # one pass over the comment. text carries on whatever the tag before it was
+    # saying until a blank line, and anything else is part of the details.
+    brief = list()
+    details = list()
+    notes = list()
+    params = dict()
+    returns = None
+    throws = list()
+
+    current = None
+    for line in lines:
+        text = strip_decoration(line)
+        if text == "":
+            current = None
+            continue
+
+        match = tag_pattern.match(text)
+        if match is None:
+            if current is None:
+                current = details
+            current.append(text)
+            continue
+
+        tag, option, rest = match.groups()
+        current = [rest] if rest != "" else list()
+        if tag == "brief":
+            brief.extend(current)
+            current = brief
+        elif tag == "note":
+            notes.append(current)
+        elif tag in PARAM_TAGS:
+            name, _, param_text = rest.partition(" ")
+            current = [param_text.strip()] if param_text.strip() != "" else list()
+            params[name] = current
+        elif tag in RETURN_TAGS:
+            returns = current
+        elif tag in THROW_TAGS:
+            throws.append(current)
+        else:
+            # a tag nothing here knows about is kept as it was written.
+            details.append(text)
+            current = details
+
+    return DoxygenComment(
+        num_lines=len(lines),
+        brief=join_text(brief),
+        details=join_text(details),
+        notes=tuple(join_text(note) for note in notes),
+        params={name: join_text(param) for name, param in params.items()},
+        returns=None if returns is None else join_text(returns),
+        throws=tuple(join_text(throw) for throw in throws)
+    )
+
+comment_cache = dict()
+
+def parse_doxygen(lines) -> DoxygenComment:
+    # the same comment comes up again and again, in the checker every time a
+    # function is looked at and in the document for every file, so each one is
+    # only parsed the first time it is seen.
+    digest = hashlib.sha1("\n".join(lines).encode("utf-8")).digest()
+    comment = comment_cache.get(digest)
+    if comment is None:
+        comment = parse_lines(lines)
+        if len(comment_cache) >= COMMENT_CACHE_SIZE:
+            del comment_cache[next(iter(comment_cache))]
+        comment_cache[digest] = comment
+    return comment
+
+EMPTY_COMMENT = parse_lines(())
+
+def read_comment(report, file_lines=None) -> DoxygenComment | None:
+    lines = project_crawler.read_doxygen(report, file_lines)
+    if lines is None:
+        return None
+    return parse_doxygen(lines)
+
+def get_missing_tags(report, comment, require_text=True) -> list[str]:
+    # the tags the checker wants that the comment doesn't have. without
+    # require_text, a tag that is there but hasn't been filled in yet counts.
+    missing = list()
+    for param in report.params:
+        if param.name != "<unknown>" and param.name not in comment.params:
+            missing.append(f"@param {param.name}")
+
+    if report.returns == "exception":
+        if require_text:
+            has_throws = any(throw != "" for throw in comment.throws)
+        else:
+            has_throws = len(comment.throws) > 0
+        if not has_throws:
+            missing.append("@throws")
+    elif report.returns not in ("void", "tek_init"):
+        if require_text:
+            has_returns = bool(comment.returns)
+        else:
+            has_returns = comment.returns is not None
+        if not has_returns:
+            missing.append("@return")
+    return missing
+
+def check_comment(report, comment) -> bool:
+    if comment is None:
+        return False
+    if comment.num_lines >= 3 and report.type != project_crawler.ReportType.FUNCTION:
+        return True
+    if report.returns == "tek_init" and comment.num_lines < 3:
+        return False
+    return len(get_missing_tags(report, comment)) == 0
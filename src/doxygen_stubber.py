@@ -0,0 +1,174 @@
+import argparse
+import difflib
+import functools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import project_crawler
+import doxygen_parser
+import file_walker
+
+@dataclass
+class StubResult:
+    file: str
+    num_stubs: int = 0
+    num_completed: int = 0
+    skipped: list[str] = field(default_factory=list)
+    diff: str | None = None
+
+    @property
+    def num_edits(self) -> int:
+        return self.num_stubs + self.num_completed
+
+def get_indent(line) -> str:
+    return line[:len(line) - len(line.lstrip())]
+
+def generate_stub(report, indent="") -> list[str]:
+    # the same skeleton the editor inserts, one tag per thing the checker will
+    # look for, with the text left for whoever fills it in.
+    lines = ["/**", " * "]
+    for param in report.params:
+        if param.name != "<unknown>":
+            lines.append(f" * @param {param.name} ")
+    if report.type == project_crawler.ReportType.FUNCTION:
+        if report.returns == "exception":
+            lines.append(" * @throws ")
+        elif report.returns != "void":
+            lines.append(" * @return ")
+    lines.append(" */")
+    return [indent + line for line in lines]
+
+def plan_edits(reports, file_lines, ignore=None):
+    # every edit is a list of lines to go in before a given line, and nothing is
+    # ever taken out, so a comment that is there but incomplete only gets the tags
+    # it is missing added just above its closing line.
+    edits = list()
+    result = StubResult(file="")
+    for report in reports:
+        if ignore is not None and report in ignore:
+            continue
+
+        comment = doxygen_parser.read_comment(report, file_lines)
+        if doxygen_parser.check_comment(report, comment):
+            continue
+
+        if comment is None:
+            indent = get_indent(file_lines[report.start_line])
+            edits.append((report.start_line, generate_stub(report, indent)))
+            result.num_stubs += 1
+            continue
+
+        end_line = report.start_line + report.doxygen_lines - 1
+        closing_line = file_lines[end_line]
+        if report.type != project_crawler.ReportType.FUNCTION or closing_line.strip() != "*/":
+            # a one line comment, or one on something that isn't a function, has
+            # to be rewritten by hand.
+            result.skipped.append(f"{report.name}:{report.start_line + report.doxygen_lines + 1}")
+            continue
+
+        # tags that are there but empty are left for someone to fill in.
+        missing = doxygen_parser.get_missing_tags(report, comment, require_text=False)
+        if len(missing) == 0:
+            continue
+
+        indent = get_indent(closing_line)
+        edits.append((end_line, [f"{indent}* {tag} " for tag in missing]))
+        result.num_completed += 1
+    return edits, result
+
+def apply_edits(file_lines, edits) -> list[str]:
+    # from the bottom up, so the line numbers of the edits still to come don't move.
+    new_lines = list(file_lines)
+    for line_number, lines in sorted(edits, key=lambda edit: edit[0], reverse=True):
+        new_lines[line_number:line_number] = lines
+    return new_lines
+
+def stub_file(file_path, ignore=None, dry_run=False) -> StubResult:
+    with open(file_path, "r", encoding="utf-8", newline="") as f:
+        file_data = f.read()
+    # the file is parsed and edited with plain newlines, and written back with
+    # whichever ones it had.
+    newline = "\r\n" if "\r\n" in file_data else "\n"
+    file_data = file_data.replace("\r\n", "\n")
+
+    file_lines = file_data.split("\n")
+    reports = project_crawler.scan_file(file_path, file_data)
+    edits, result = plan_edits(reports, file_lines, ignore)
+    result.file = file_path
+    if len(edits) == 0:
+        return result
+
+    new_lines = apply_edits(file_lines, edits)
+    if dry_run:
+        result.diff = "".join(line + "\n" for line in difflib.unified_diff(
+            file_lines,
+            new_lines,
+            fromfile=file_path,
+            tofile=file_path,
+            lineterm=""
+        ))
+    else:
+        with open(file_path, "w", encoding="utf-8", newline="") as f:
+            f.write(newline.join(new_lines))
+    return result
+
+def stub_files(file_paths, ignore=None, dry_run=False, jobs=1):
+    # every file is read, edited and written in one go by one worker, and the
+    # results come back in the order the files were given.
+    file_paths = list(file_paths)
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+
+    target = functools.partial(stub_file, ignore=ignore, dry_run=dry_run)
+    if jobs <= 1 or len(file_paths) <= 1:
+        yield from map(target, file_paths)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(target, file_paths, chunksize=max(1, len(file_paths) // (jobs * 8)))
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="TekPhysics Doxygen Stubber",
+        description="Add a doxygen skeleton to everything in the project that is missing one"
+    )
+    parser.add_argument("--root", default=project_crawler.PROJECT_ROOT)
+    parser.add_argument("--search", nargs="*", default=project_crawler.SEARCH)
+    parser.add_argument("--include", nargs="+", default=None)
+    parser.add_argument("--exclude", nargs="+", default=None)
+    parser.add_argument("--ignorefile", default="res/ignorefile.txt")
+    parser.add_argument("-n", "--dry_run", action="store_true")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    ignore = project_crawler.IgnoreStore(args.ignorefile, args.root)
+    search = args.search if len(args.search) > 0 else None
+    file_filter = file_walker.FileFilter(include=args.include, exclude=args.exclude)
+    file_paths = project_crawler.find_project_files(args.root, file_filter, search)
+
+    num_files = 0
+    num_stubs = 0
+    num_completed = 0
+    num_skipped = 0
+    for result in stub_files(file_paths, ignore, args.dry_run, args.jobs):
+        if result.diff is not None:
+            sys.stdout.write(result.diff)
+        for skipped in result.skipped:
+            print(f"Skipped {result.file}: {skipped}", file=sys.stderr)
+        if result.num_edits > 0:
+            num_files += 1
+        num_stubs += result.num_stubs
+        num_completed += result.num_completed
+        num_skipped += len(result.skipped)
+
+    if args.dry_run:
+        summary = f"Would add {num_stubs} stub(s) and complete {num_completed} comment(s)"
+    else:
+        summary = f"Added {num_stubs} stub(s) and completed {num_completed} comment(s)"
+    print(f"{summary} in {num_files} of {len(file_paths)} file(s), {num_skipped} skipped", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import fnmatch
+import os
+import re
+from dataclasses import dataclass
+
+SOURCE_EXTENSIONS = (".c", ".h")
+SKIP_DIRECTORIES = frozenset((".git",))
+GITIGNORE_FILE = ".gitignore"
+
+@dataclass
+class IgnoreRule:
+    pattern: re.Pattern
+    negate: bool
+    dir_only: bool
+
+def translate_gitignore(pattern) -> str:
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+            continue
+
+        char = pattern[i]
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                regex += re.escape(char)
+            else:
+                chars = pattern[i + 1:end]
+                if chars.startswith("!"):
+                    chars = "^" + chars[1:]
+                regex += "[" + chars.replace("\\", "\\\\") + "]"
+                i = end
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            regex += re.escape(pattern[i])
+        else:
+            regex += re.escape(char)
+        i += 1
+    return regex
+
+def parse_gitignore(ignore_data) -> list[IgnoreRule]:
+    rules = list()
+    for line in ignore_data.split("\n"):
+        line = line.rstrip("\r")
+        if not line.endswith("\\ "):
+            line = line.rstrip(" ")
+        if line == "" or line.startswith("#"):
+            continue
+
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if line == "":
+            continue
+
+        # a slash anywhere but the end ties the pattern to the directory the
+        # .gitignore is in, otherwise it can match at any depth below it.
+        regex = translate_gitignore(line.lstrip("/"))
+        if "/" in line:
+            regex = "^" + regex + "$"
+        else:
+            regex = "^(?:.*/)?" + regex + "$"
+        rules.append(IgnoreRule(re.compile(regex, re.DOTALL), negate, dir_only))
+    return rules
+
+def read_gitignore(file_path) -> list[IgnoreRule]:
+    try:
+        with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+            return parse_gitignore(f.read())
+    except OSError:
+        return list()
+
+def compile_globs(patterns):
+    if patterns is None:
+        return None
+    return re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns))
+
+class FileFilter:
+    # decides which files under a project get handed to the parser at all. a file
+    # has to have one of the extensions, match an include glob if there are any,
+    # and not match an exclude glob or be ignored by a .gitignore on the way down
+    # to it. globs are tried against the path from the root, the file name and
+    # the full path.
+    def __init__(self, extensions=SOURCE_EXTENSIONS, include=None, exclude=None, use_gitignore=True):
+        self.extensions = None if extensions is None else tuple(extension.lower() for extension in extensions)
+        self.include = compile_globs(include)
+        self.exclude = compile_globs(exclude)
+        self.use_gitignore = use_gitignore
+        self.gitignores = dict()
+
+    def get_gitignore(self, directory) -> list[IgnoreRule]:
+        rules = self.gitignores.get(directory)
+        if rules is None:
+            rules = read_gitignore(os.path.join(directory, GITIGNORE_FILE))
+            self.gitignores[directory] = rules
+        return rules
+
+    @staticmethod
+    def globs_match(globs, path, relative_path, name) -> bool:
+        return globs.match(relative_path) is not None or globs.match(name) is not None or globs.match(path) is not None
+
+    @staticmethod
+    def is_ignored(ignore_stack, path, is_dir) -> bool:
+        # the last rule to match wins, and rules from deeper down come later.
+        ignored = False
+        for directory, rules in ignore_stack:
+            relative_path = path[len(directory) + 1:].replace(os.sep, "/")
+            for rule in rules:
+                if rule.dir_only and not is_dir:
+                    continue
+                if rule.pattern.match(relative_path) is not None:
+                    ignored = not rule.negate
+        return ignored
+
+    def accepts_directory(self, ignore_stack, path, relative_path, name) -> bool:
+        if name in SKIP_DIRECTORIES:
+            return False
+        if self.exclude is not None and self.globs_match(self.exclude, path, relative_path, name):
+            return False
+        return not self.is_ignored(ignore_stack, path, True)
+
+    def accepts_file(self, ignore_stack, path, relative_path, name) -> bool:
+        if self.extensions is not None and not name.lower().endswith(self.extensions):
+            return False
+        if self.include is not None and not self.globs_match(self.include, path, relative_path, name):
+            return False
+        if self.exclude is not None and self.globs_match(self.exclude, path, relative_path, name):
+            return False
+        return not self.is_ignored(ignore_stack, path, False)
+
+    def push_gitignore(self, ignore_stack, directory, exists=True):
+        if not self.use_gitignore:
+            return ignore_stack
+        if not exists:
+            # already known from the directory listing, so don't go looking for it.
+            self.gitignores[directory] = list()
+            return ignore_stack
+        rules = self.get_gitignore(directory)
+        if len(rules) == 0:
+            return ignore_stack
+        return (*ignore_stack, (directory, rules))
+
+    def walk(self, root, names=None):
+        # names limits what is looked at directly inside the root, and everything
+        # below those is walked in full. entries are visited in name order, and
+        # scandir's DirEntry already knows which ones are directories on most
+        # systems, so nothing is stat'd that doesn't have to be.
+        root = os.path.abspath(root)
+        if os.path.isfile(root):
+            ignore_stack = self.push_gitignore((), os.path.dirname(root))
+            if self.accepts_file(ignore_stack, root, os.path.basename(root), os.path.basename(root)):
+                yield root
+            return
+
+        dir_queue = list()
+        dir_queue.append((root, ()))
+        while len(dir_queue) > 0:
+            current_dir, ignore_stack = dir_queue.pop(-1)
+            try:
+                with os.scandir(current_dir) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError:
+                continue
+            has_gitignore = any(entry.name == GITIGNORE_FILE for entry in entries)
+            ignore_stack = self.push_gitignore(ignore_stack, current_dir, has_gitignore)
+
+            sub_dirs = list()
+            for entry in entries:
+                if names is not None and current_dir == root and entry.name not in names:
+                    continue
+                relative_path = entry.path[len(root) + 1:].replace(os.sep, "/")
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    is_file = not is_dir and entry.is_file()
+                except OSError:
+                    continue
+
+                if is_dir:
+                    if self.accepts_directory(ignore_stack, entry.path, relative_path, entry.name):
+                        sub_dirs.append((entry.path, ignore_stack))
+                elif is_file:
+                    if self.accepts_file(ignore_stack, entry.path, relative_path, entry.name):
+                        yield entry.path
+
+            # reversed so that they come back off the queue in name order.
+            dir_queue.extend(reversed(sub_dirs))
+
+    def matches(self, root, path, names=None, is_dir=False) -> bool:
+        # the same decision walk would make, for one path on its own, such as one a
+        # watcher has said has changed. the file doesn't have to exist any more.
+        # with is_dir it is whether walk would go into the directory at path.
+        root = os.path.abspath(root)
+        path = os.path.abspath(path)
+        if not path.startswith(root + os.sep):
+            return False
+
+        parts = path[len(root) + 1:].split(os.sep)
+        if names is not None and parts[0] not in names:
+            return False
+
+        ignore_stack = ()
+        current_dir = root
+        for i, part in enumerate(parts[:-1]):
+            ignore_stack = self.push_gitignore(ignore_stack, current_dir)
+            current_dir = os.path.join(current_dir, part)
+            if not self.accepts_directory(ignore_stack, current_dir, "/".join(parts[:i + 1]), part):
+                return False
+        ignore_stack = self.push_gitignore(ignore_stack, current_dir)
+        if is_dir:
+            return self.accepts_directory(ignore_stack, path, "/".join(parts), parts[-1])
+        return self.accepts_file(ignore_stack, path, "/".join(parts), parts[-1])
+
+def walk_files(root, names=None, extensions=SOURCE_EXTENSIONS, include=None, exclude=None, use_gitignore=True):
+    return FileFilter(extensions, include, exclude, use_gitignore).walk(root, names)
@@ -0,0 +1,177 @@
+import ctypes
+import os
+import select
+import struct
+import time
+
+import file_walker
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM  = 0x00000040
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+IN_DELETE      = 0x00000200
+IN_Q_OVERFLOW  = 0x00004000
+IN_IGNORED     = 0x00008000
+IN_ISDIR       = 0x40000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+EVENT_HEADER = struct.Struct("iIII")
+
+def walk_files(path, file_filter, project_root, names=None):
+    # the files under path that the crawler would look at. walking from path only
+    # sees the .gitignores from there down, so anything found is checked against
+    # the ones above it as well, unless path is the project root itself.
+    if path == project_root:
+        yield from file_filter.walk(path, names)
+        return
+    for file_path in file_filter.walk(path):
+        if file_filter.matches(project_root, file_path, names):
+            yield file_path
+
+def is_under(path, roots):
+    for root in roots:
+        if path == root or path.startswith(root + os.sep):
+            return True
+    return False
+
+class Watcher:
+    # only the files the crawler would look at are watched, judged from the project
+    # root by the same FileFilter, so nothing under .git or a gitignored directory
+    # ever shows up as changed.
+    def __init__(self, roots, project_root, names=None, file_filter=None):
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.project_root = os.path.abspath(project_root)
+        self.names = names
+        self.file_filter = file_walker.FileFilter() if file_filter is None else file_filter
+
+    def walk_files(self, path):
+        return walk_files(path, self.file_filter, self.project_root, self.names)
+
+    def accepts(self, path, is_dir=False) -> bool:
+        return self.file_filter.matches(self.project_root, path, self.names, is_dir)
+
+class PollingWatcher(Watcher):
+    def __init__(self, roots, project_root, names=None, file_filter=None, interval=1.0):
+        super().__init__(roots, project_root, names, file_filter)
+        self.interval = interval
+        self.files = self.snapshot()
+
+    def snapshot(self):
+        files = dict()
+        for root in self.roots:
+            for file_path in self.walk_files(root):
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                files[file_path] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def wait(self) -> set[str]:
+        while True:
+            time.sleep(self.interval)
+            files = self.snapshot()
+            changed = set()
+            for file_path in files.keys() | self.files.keys():
+                if files.get(file_path) != self.files.get(file_path):
+                    changed.add(file_path)
+            self.files = files
+            if len(changed) > 0:
+                return changed
+
+    def close(self):
+        pass
+
+class InotifyWatcher(Watcher):
+    def __init__(self, roots, project_root, names=None, file_filter=None, settle=0.05):
+        super().__init__(roots, project_root, names, file_filter)
+        self.settle = settle
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = dict()
+
+        for root in self.roots:
+            if os.path.isdir(root):
+                self.add_tree(root)
+            else:
+                # single files are watched through their directory and filtered by name.
+                self.add_directory(os.path.dirname(root))
+
+    def add_directory(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd >= 0:
+            self.directories[wd] = path
+
+    def add_tree(self, path):
+        dir_queue = list()
+        dir_queue.append(path)
+        while len(dir_queue) > 0:
+            current_dir = dir_queue.pop(-1)
+            self.add_directory(current_dir)
+            try:
+                entries = list(os.scandir(current_dir))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False) and self.accepts(entry.path, True):
+                    dir_queue.append(entry.path)
+
+    def read_events(self) -> set[str]:
+        changed = set()
+        data = os.read(self.fd, 65536)
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                # events were dropped, so everything has to be treated as changed.
+                for root in self.roots:
+                    changed.update(self.walk_files(root))
+                continue
+
+            directory = self.directories.get(wd)
+            if directory is None:
+                continue
+
+            if mask & IN_IGNORED:
+                del self.directories[wd]
+                continue
+
+            path = os.path.join(directory, os.fsdecode(name))
+            if not is_under(path, self.roots):
+                continue
+
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and self.accepts(path, True):
+                    self.add_tree(path)
+                    changed.update(self.walk_files(path))
+                continue
+
+            if self.accepts(path):
+                changed.add(path)
+        return changed
+
+    def wait(self) -> set[str]:
+        changed = set()
+        while len(changed) == 0:
+            select.select([self.fd], [], [])
+            changed.update(self.read_events())
+            # editors tend to save in a few steps, so let the burst finish first.
+            while select.select([self.fd], [], [], self.settle)[0]:
+                changed.update(self.read_events())
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+def create_watcher(roots, project_root, names=None, file_filter=None):
+    try:
+        return InotifyWatcher(roots, project_root, names, file_filter)
+    except (OSError, AttributeError, TypeError):
+        return PollingWatcher(roots, project_root, names, file_filter)
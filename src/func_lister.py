@@ -1,8 +1,23 @@
 import project_crawler
+import doxygen_parser
+import argparse
+import hashlib
+import html
+import json
 import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from msl.odt import Document
 
+PROJECT_ROOT = os.path.expanduser("~/CLionProjects/TekPhysics/")
+DOCUMENT_FILE = "res/test"
+DOCUMENT_CACHE_FILE = ".document_cache.json"
+DOCUMENT_CACHE_VERSION = 2
+HEADER_ROW = ["Name", "Parameters", "Return", "Description"]
+COLUMN_WIDTHS = [3.5, 3.5, 3, 7]
+
 @dataclass
 class Description:
     name: str
@@ -40,79 +55,40 @@ def add_row(table, description):
 def get_data(table):
     return table.names, table.params, table.returns, table.descriptions
 
-def process_doxygen(report):
-    description = ""
-    params = list()
-    throws = list()
-    returns = ""
-    for line in report.doxygen_comment:
-        if line.startswith("/**") or line.startswith(" */"):
-            continue
-        if line.startswith(" * "):
-            line = line[3:]
-
-        if line.startswith("@brief"):
-            line = line.removeprefix("@brief")
-            description += line
-        elif line.startswith("@note"):
-            line = line.removeprefix("@note")
-            description += " NOTE:" + line
-        elif line.startswith("@param"):
-            params.append(line.removeprefix("@param ").removeprefix("@param[in] ").removeprefix("@param[out] ").removeprefix("@param[in/out] "))
-        elif line.startswith("@throws"):
-            throws.append(line.removeprefix("@throws "))
-        elif line.startswith("@return"):
-            returns = line.removeprefix("@return ").removeprefix("@returns ").removesuffix(".").removesuffix(". ")
-        else:
-            description += " " + line
-
-    description.strip()
+def process_doxygen(report, file_lines=None):
+    comment = doxygen_parser.read_comment(report, file_lines) or doxygen_parser.EMPTY_COMMENT
 
-    returns += ": " + report.returns
+    returns = None
+    if report.returns not in ("void", "exception", "", "tek_init"):
+        returns = (comment.returns or "").removesuffix(".") + ": " + report.returns
 
-    if report.returns in ("void", "exception", "", "tek_init"):
-        returns = None
-
-    len_params = len(params)
     r_params = list()
-    if len_params == 0:
-        params = None
-    else:
+    if len(comment.params) > 0:
         for param in report.params:
             if param.name != "<unknown>":
                 r_params.append(param)
 
-        if len(r_params) != len_params:
-            for param in params:
-                p_name = param.split(" ")[0]
-                found = False
-                for r_param in r_params:
-                    if p_name == r_param.name:
-                        found = True
-                        break
-                if not found:
+        # anything documented that the declaration didn't give a name for.
+        if len(r_params) != len(comment.params):
+            names = {param.name for param in r_params}
+            for name in comment.params:
+                if name not in names:
                     r_params.append(project_crawler.Parameter(
-                        name=p_name,
+                        name=name,
                         type="?"
                     ))
 
     return Description(
         name=report.name,
-        description=description,
+        description=comment.description,
         params=r_params if len(r_params) > 0 else None,
         returns=returns,
         file=report.file
     )
 
-def process_file(f_path, f_list, f_ignore):
-    f_data = project_crawler.read_file(f_path)
-    f_lines = f_data.split("\n")
-    for i in range(len(f_lines)):
-        report = project_crawler.generate_function_report(f_path, f_lines, i)
-        if report is None:
-            continue
-
-        if project_crawler.generate_report_hash(report) in f_ignore:
+def process_file(f_path, f_list, f_ignore, f_cache=None):
+    for report in project_crawler.get_file_reports(f_path, f_cache):
+        if project_crawler.is_ignored(report, f_ignore):
             continue
 
         f_list.append(report)
@@ -120,49 +96,294 @@ def process_file(f_path, f_list, f_ignore):
 def param_to_string(param):
     return f"{param.name}: {param.type}"
 
-def create_document(function_list: list[Description], filename="res/test.odt"):
-    doc = Document(filename)
-    header_row = ["Name", "Parameters", "Return", "Description"]
-
+def get_section_title(file_path):
+    return os.path.basename(file_path).split(".")[0]
+
+def make_table(descriptions) -> Table:
+    table = new_table()
+    for description in descriptions:
+        add_row(table, description)
+    return table
+
+class DocumentBackend(ABC):
+    # a document is written out of the way and only put in place of the output by
+    # close, once everything has gone into it. if anything goes wrong before then
+    # it is discarded instead, and the output of the last run that finished stays.
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    @abstractmethod
+    def render_section(self, title, table):
+        pass
+
+    @abstractmethod
+    def close(self):
+        pass
+
+    @abstractmethod
+    def discard(self):
+        pass
+
+class OdtBackend(DocumentBackend):
+    # an odt can only be saved whole, so the document itself is built up in
+    # memory, but what gets cached is each file's table data, which is where the
+    # time goes.
+    name = "odt"
+    extension = ".odt"
+
+    def __init__(self, filename):
+        # a Document deletes whatever is at its filename as soon as it is made, so
+        # it is given one in a directory of its own next to the output.
+        self.temp_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(filename)))
+        self.doc = Document(os.path.join(self.temp_dir, os.path.basename(filename)))
+        self.filename = os.path.join(os.path.dirname(filename), self.doc.filename.name)
+
+    def render_section(self, title, table):
+        return {"title": title, "rows": self.doc.maketabledata(*get_data(table), header_row=HEADER_ROW)}
+
+    def write_section(self, section):
+        self.doc.addtext("\n" + section["title"])
+        self.doc.addtable(section["rows"], column_width=COLUMN_WIDTHS)
+
+    def close(self):
+        self.doc.save()
+        os.replace(self.doc.filename, self.filename)
+        self.discard()
+
+    def discard(self):
+        # a Document that still has its doc saves it again when it is collected.
+        if hasattr(self.doc, "doc"):
+            del self.doc.doc
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+class TextBackend(DocumentBackend):
+    # a text document is written out a section at a time as they come in, and
+    # the cached section is the finished text.
+    name = None
+    extension = None
+
+    def __init__(self, filename):
+        if not filename.endswith(self.extension):
+            filename += self.extension
+        self.filename = filename
+        self.temp_file = filename + ".tmp"
+        self.f = open(self.temp_file, "w", encoding="utf-8")
+        self.f.write(self.render_header(os.path.basename(filename).removesuffix(self.extension)))
+
+    def render_header(self, title):
+        return ""
+
+    def render_footer(self):
+        return ""
+
+    def write_section(self, section):
+        self.f.write(section)
+
+    def close(self):
+        self.f.write(self.render_footer())
+        self.f.close()
+        os.replace(self.temp_file, self.filename)
+
+    def discard(self):
+        self.f.close()
+        os.remove(self.temp_file)
+
+def escape_markdown(text):
+    return text.replace("\\", "\\\\").replace("|", "\\|").replace("\n", " ")
+
+class MarkdownBackend(TextBackend):
+    name = "md"
+    extension = ".md"
+
+    def render_header(self, title):
+        return f"# {title}\n"
+
+    def render_section(self, title, table):
+        lines = [
+            "",
+            f"## {escape_markdown(title)}",
+            "",
+            "| " + " | ".join(HEADER_ROW) + " |",
+            "|" + " --- |" * len(HEADER_ROW),
+        ]
+        for row in zip(*get_data(table)):
+            lines.append("| " + " | ".join(escape_markdown(cell) for cell in row) + " |")
+        return "\n".join(lines) + "\n"
+
+class HtmlBackend(TextBackend):
+    name = "html"
+    extension = ".html"
+
+    def render_header(self, title):
+        return (
+            "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+            f"<title>{html.escape(title)}</title>\n"
+            "<style>table { border-collapse: collapse; } th, td { border: 1px solid #999; padding: 2px 6px; vertical-align: top; }</style>\n"
+            f"</head>\n<body>\n<h1>{html.escape(title)}</h1>\n"
+        )
+
+    def render_footer(self):
+        return "</body>\n</html>\n"
+
+    def render_section(self, title, table):
+        lines = [
+            f"<h2>{html.escape(title)}</h2>",
+            "<table>",
+            "<tr>" + "".join(f"<th>{html.escape(cell)}</th>" for cell in HEADER_ROW) + "</tr>",
+        ]
+        for row in zip(*get_data(table)):
+            lines.append("<tr>" + "".join(f"<td>{html.escape(cell)}</td>" for cell in row) + "</tr>")
+        lines.append("</table>")
+        return "\n".join(lines) + "\n"
+
+DOCUMENT_BACKENDS = {backend.name: backend for backend in (OdtBackend, MarkdownBackend, HtmlBackend)}
+
+def get_ignore_digest(ignore):
+    if ignore is None:
+        return None
+    return hashlib.sha1("\n".join(sorted(ignore.entries)).encode("utf-8")).hexdigest()
+
+class DocumentCache:
+    # each file's rendered section for each backend, kept against the hash of the
+    # file's contents, so only files that have changed since the last run are
+    # parsed and rendered again. changing what is ignored changes every section,
+    # so the whole cache goes with it.
+    def __init__(self, cache_file=DOCUMENT_CACHE_FILE, ignore=None):
+        self.cache_file = cache_file
+        self.ignore_digest = get_ignore_digest(ignore)
+        self.files = dict()
+        self.used = set()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                cache_data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if not isinstance(cache_data, dict) or cache_data.get("version") != DOCUMENT_CACHE_VERSION:
+            return
+        if cache_data.get("ignore") != self.ignore_digest:
+            return
+        self.files = cache_data["files"]
+
+    def save(self):
+        # files that weren't part of this run have gone from the project, or at
+        # least from the document.
+        files = {file_path: entry for file_path, entry in self.files.items() if file_path in self.used}
+        temp_file = self.cache_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump({"version": DOCUMENT_CACHE_VERSION, "ignore": self.ignore_digest, "files": files}, f)
+        os.replace(temp_file, self.cache_file)
+
+    def lookup(self, file_path, file_hash, backend_name):
+        self.used.add(file_path)
+        entry = self.files.get(file_path)
+        if entry is None or entry["hash"] != file_hash:
+            return None
+        return entry["sections"].get(backend_name)
+
+    def store(self, file_path, file_hash, backend_name, section):
+        self.used.add(file_path)
+        entry = self.files.get(file_path)
+        if entry is None or entry["hash"] != file_hash:
+            entry = {"hash": file_hash, "sections": dict()}
+            self.files[file_path] = entry
+        entry["sections"][backend_name] = section
+
+def render_file_section(file_path, reports, backend, ignore=None):
+    # only what has a doxygen block has anything to put in the table.
+    reports = [report for report in reports if report.doxygen_lines > 0]
+    if ignore is not None:
+        reports = [report for report in reports if not project_crawler.is_ignored(report, ignore)]
+
+    descriptions = list()
+    for report, mapped in project_crawler.iter_report_sources(reports):
+        descriptions.append(process_doxygen(report, mapped))
+
+    # a file with nothing in it to document gets an empty section, which is
+    # still worth caching so that it isn't parsed again next time.
+    if len(descriptions) == 0:
+        return ""
+    return backend.render_section(get_section_title(file_path), make_table(descriptions))
+
+def write_document(file_paths, backend, ignore=None, cache=None, document_cache=None, jobs=1):
+    # one file's reports are turned into one section of the document and written
+    # out before the next file is looked at. only the files whose sections aren't
+    # already cached are handed to the parser, and those can be parsed in parallel.
+    file_paths = list(file_paths)
+
+    file_hashes = dict()
+    cached = dict()
+    if document_cache is not None:
+        for file_path in file_paths:
+            file_hashes[file_path] = project_crawler.hash_file(file_path)
+            section = document_cache.lookup(file_path, file_hashes[file_path], backend.name)
+            if section is not None:
+                cached[file_path] = section
+
+    pending = [file_path for file_path in file_paths if file_path not in cached]
+    file_reports = project_crawler.iter_file_reports(pending, cache, jobs)
+
+    num_rendered = 0
+    for file_path in file_paths:
+        section = cached.pop(file_path, None)
+        if section is None:
+            _, reports = next(file_reports)
+            section = render_file_section(file_path, reports, backend, ignore)
+            if document_cache is not None:
+                document_cache.store(file_path, file_hashes[file_path], backend.name, section)
+            num_rendered += 1
+        if section:
+            backend.write_section(section)
+    return num_rendered
+
+def create_document(function_list: list[Description], filename="res/test.odt", backend_name="odt"):
     files = dict()
 
     for description in function_list:
         if description.file not in files:
-            files[description.file] = new_table()
+            files[description.file] = list()
 
-        add_row(files[description.file], description)
+        files[description.file].append(description)
 
-    for file, table in files.items():
-        table_data = doc.maketabledata(*get_data(table), header_row=header_row)
-
-        doc.addtext("\n" + os.path.basename(file).split(".")[0])
-        doc.addtable(table_data, column_width=[3.5, 3.5, 3, 7])
+    with DOCUMENT_BACKENDS[backend_name](filename) as backend:
+        for file, descriptions in files.items():
+            backend.write_section(backend.render_section(get_section_title(file), make_table(descriptions)))
 
 def main():
-    ignore = list()
-    with open("res/ignorefile.txt") as f_ptr:
-        ignorefile = f_ptr.read().split("\n")
-    for line in ignorefile:
-        ignore.append(line)
-
-    file_tree = project_crawler.generate_file_tree(project_root=os.path.expanduser("~/CLionProjects/TekPhysics/"))
-
-    file_queue = list()
-    file_queue.append(file_tree)
-    file_list: list[project_crawler.Report] = list()
-    while len(file_queue) > 0:
-        file_tree = file_queue.pop(-1)
-        for file_name, file_data in file_tree.items():
-            if type(file_data) == dict:
-                file_queue.append(file_data)
-            else:
-                process_file(file_data, file_list, ignore)
-
-    doxy_list = list()
-    for file in file_list:
-        doxy_list.append(process_doxygen(file))
-
-    create_document(doxy_list)
+    parser = argparse.ArgumentParser(
+        prog="TekPhysics Function Lister",
+        description="Generate a table of every documented function in the project"
+    )
+    parser.add_argument("-f", "--format", choices=DOCUMENT_BACKENDS.keys(), default="odt")
+    parser.add_argument("-o", "--output", default=DOCUMENT_FILE)
+    parser.add_argument("--root", default=PROJECT_ROOT)
+    parser.add_argument("--no_cache", action="store_true")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    ignore = project_crawler.IgnoreStore("res/ignorefile.txt", args.root)
+
+    cache = None if args.no_cache else project_crawler.ReportCache()
+    document_cache = None if args.no_cache else DocumentCache(ignore=ignore)
+
+    file_paths = project_crawler.find_project_files(args.root)
+    with DOCUMENT_BACKENDS[args.format](args.output) as backend:
+        num_rendered = write_document(file_paths, backend, ignore, cache, document_cache, args.jobs)
+
+    if cache is not None:
+        cache.save()
+    if document_cache is not None:
+        document_cache.save()
+    print(f"Rendered {num_rendered} of {len(file_paths)} file section(s)")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,12 +1,22 @@
+import bisect
 import os.path
+import re
 import time
+from itertools import accumulate, chain, repeat
+from operator import itemgetter, sub
 
 import project_crawler
+import async_loader
+import doxygen_parser
+import doxygen_stubber
 import tkinter as tk
 import tkinter.ttk as ttk
-from enum import Enum, auto
+from enum import Enum
 from dataclasses import dataclass
 import threading
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ROOT = os.path.expanduser("~/CLionProjects/TekPhysics/")
 
 class HighlighterMode(Enum):
     KEYWORD = "keyword"
@@ -16,25 +26,12 @@ class HighlighterMode(Enum):
     NUMBER  = "number"
     COMMENT = "comment"
 
-class CommentMode(Enum):
-    NONE        = auto()
-    AWAIT_NEXT  = auto()
-    SINGLE_LINE = auto()
-    MULTI_LINE  = auto()
-    AWAIT_FINAL = auto()
-
 @dataclass
 class Config:
     id: HighlighterMode
     colour: str
 
-@dataclass
-class Word:
-    word: str
-    start: int
-    end: int
-
-KEYWORDS = (
+KEYWORDS = frozenset((
     "alignas",
     "alignof",
     "auto",
@@ -80,9 +77,9 @@ KEYWORDS = (
     "void",
     "volatile",
     "while"
-)
+))
 
-TYPES = (
+TYPES = frozenset((
     "bool",
     "char",
     "flag",
@@ -96,7 +93,7 @@ TYPES = (
     "vec4",
     "mat3",
     "mat4"
-)
+))
 
 class Colour:
     BACKGROUND = "#FAF9DE"
@@ -108,45 +105,85 @@ class Colour:
     COMMENT = "#567F62"
     MACRO = "#990000"
 
-@dataclass
-class Tag:
-    id: HighlighterMode
-    start: str
-    end: str
-
-class Highlighter:
-    @staticmethod
-    def split_str(text, delimiters):
-        text += "\0"
-        start_index = -1
-        word_builder = ""
-        word_list = list()
-        for i, char in enumerate(text):
-            if char in delimiters:
-                if word_builder == "":
-                    continue
-                word_list.append(Word(word_builder, start_index, i))
-                word_builder = ""
-            else:
-                if word_builder == "":
-                    start_index = i
-                word_builder += char
+def get_word_pattern(words) -> str:
+    # the words as a tree of the letters they share, so that the engine only ever
+    # has to look at one branch for each letter rather than at every word.
+    tree = dict()
+    for word in words:
+        node = tree
+        for char in word:
+            node = node.setdefault(char, dict())
+        node[""] = None
+
+    def get_node_pattern(node):
+        branches = [re.escape(char) + get_node_pattern(child) for char, child in sorted(node.items()) if char != ""]
+        if len(branches) == 0:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # a word that ends here but is also the start of a longer one.
+        if "" in node:
+            pattern = "(?:" + pattern + ")?"
+        return pattern
+
+    return get_node_pattern(tree)
+
+KNOWN_WORDS = get_word_pattern(KEYWORDS | TYPES)
+NUMBER = r'(?<![\w.])(?:0[xX][0-9A-Fa-f]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)[fFuUlL]*\b'
+
+# one pattern for everything the highlighter knows about, so the text is only
+# walked once. each match is a run of everything that can't be highlighted
+# (punctuation, and identifiers that aren't known words), skipped inside the regex
+# engine, and then one token. comments and strings swallow anything inside them
+# whole, and a macro only matches the '#' so the rest of its line is still lexed
+# (a trailing comment keeps its own colour). the matches follow straight on from
+# each other, ending with an empty token at the end of the text, so every
+# character has to be matched by something (a word starting with a letter outside
+# a-z included) or the offsets worked out from them drift.
+lexer_pattern = re.compile(
+    r'((?:[^/"\'#\w.]++'
+    r'|(?![a-z])[^\W\d]\w*+'
+    r'|(?!(?:' + KNOWN_WORDS + r')\b)[a-z]\w*+'
+    r'|/(?![*/])'
+    r'|\.(?!\d)'
+    r'|(?!' + NUMBER + r')[\d.]\w*+'
+    r')*+)'
+    r'(/\*[^*]*(?:\*+[^*/][^*]*)*(?:\*+/|\**\Z)|//[^\n\r]*'
+    r'|"(?:[^"\\\n\r]|\\.)*"?|\'(?:[^\'\\\n\r]|\\.)*\'?'
+    r'|\#'
+    r'|' + NUMBER +
+    r'|(?:' + KNOWN_WORDS + r')\b'
+    r'|\Z)',
+    re.DOTALL
+)
 
-        return word_list
+# what kind of token a token is, from the word itself if it is one of the known
+# words and from its first character if not. a few words are both.
+TOKEN_KINDS = {"/": "comment", "\"": "string", "'": "string", "#": "macro"}
+TOKEN_KINDS.update(dict.fromkeys("0123456789.", "number"))
+WORD_KINDS = dict.fromkeys(KEYWORDS, "keyword")
+WORD_KINDS.update(dict.fromkeys(TYPES, "type"))
+WORD_KINDS.update(dict.fromkeys(KEYWORDS & TYPES, "keyword type"))
 
-    @staticmethod
-    def split_text(text):
-        return Highlighter.split_str(text, delimiters=(" ", "\n", "\r", ";", ",", "(", ")", "{", "}", "\0"))
+line_end_pattern = re.compile(r'[^\n\r]*')
 
-    @staticmethod
-    def split_line(text):
-        return Highlighter.split_str(text, delimiters=("\n", "\r",))
+def get_tokens(text) -> list[tuple[str, str]]:
+    tokens = lexer_pattern.findall(text)
+    while len(tokens) > 0 and tokens[-1][1] == "":
+        tokens.pop()
+    return tokens
 
+class Highlighter:
     @staticmethod
-    def create_tag(tag_id, start, end) -> Tag:
-        return Tag(
-            tag_id, f"1.0+{start}c", f"1.0+{end}c"
-        )
+    def get_open_delimiter(text):
+        # if text ends part way through a block comment then whatever comes after
+        # it will colour differently too, up to this delimiter.
+        tokens = get_tokens(text)
+        if len(tokens) == 0:
+            return None
+        token = tokens[-1][1]
+        if token.startswith("/*") and not (len(token) >= 4 and token.endswith("*/")):
+            return "*/"
+        return None
 
     def __init__(self):
         self.rules = dict()
@@ -154,118 +191,94 @@ class Highlighter:
     def add_rule(self, rule: HighlighterMode, colour: str):
         self.rules[rule] = colour
 
-    def __generate_keyword(self, word_list: list[Word]) -> list[Tag]:
-        tags = list()
-        for word in word_list:
-            if word.word in KEYWORDS:
-                tags.append(self.create_tag(
-                    HighlighterMode.KEYWORD, word.start, word.end
-                ))
-        return tags
-
-    def __generate_type(self, word_list: list[Word]) -> list[Tag]:
-        tags = list()
-        for word in word_list:
-            if word.word.strip("*") in TYPES:
-                tags.append(self.create_tag(
-                    HighlighterMode.TYPE, word.start, word.end
-                ))
-        return tags
-
-    def __generate_macro(self, line_list: list[Word]) -> list[Tag]:
-        tags = list()
-        for line in line_list:
-            if line.word.startswith("#"):
-                tags.append(self.create_tag(
-                    HighlighterMode.MACRO, line.start, line.end
-                ))
-        return tags
-
-    def __generate_comment(self, text: str) -> list[Tag]:
-        tags = list()
-        start_index = -1
-        comment_mode = CommentMode.NONE
-        for i, char in enumerate(text):
-            if comment_mode == CommentMode.NONE:
-                if char == "/":
-                    comment_mode = CommentMode.AWAIT_NEXT
-            elif comment_mode == CommentMode.AWAIT_NEXT:
-                if char == "/":
-                    comment_mode = CommentMode.SINGLE_LINE
-                    start_index = i
-                elif char == "*":
-                    comment_mode = CommentMode.MULTI_LINE
-                    start_index = i
-                else:
-                    comment_mode = CommentMode.NONE
-            elif comment_mode == CommentMode.SINGLE_LINE:
-                if char in ("\n", "\r"):
-                    comment_mode = CommentMode.NONE
-                    tags.append(self.create_tag(
-                        HighlighterMode.COMMENT, start_index - 1, i
-                    ))
-            elif comment_mode == CommentMode.MULTI_LINE:
-                if char == "*":
-                    comment_mode = CommentMode.AWAIT_FINAL
-            elif comment_mode == CommentMode.AWAIT_FINAL:
-                if char == "/":
-                    comment_mode = CommentMode.NONE
-                    tags.append(self.create_tag(
-                        HighlighterMode.COMMENT, start_index - 1, i + 1
-                    ))
-                else:
-                    comment_mode = CommentMode.MULTI_LINE
-        return tags
-
-    def __generate_string(self, text: str) -> list[Tag]:
-        tags = list()
-        start_index = -1
-        in_string = False
-        for i, char in enumerate(text):
-            if char == "\"" and not in_string:
-                in_string = True
-                start_index = i
-            elif char == "\"" and in_string:
-                in_string = False
-                tags.append(self.create_tag(
-                    HighlighterMode.STRING, start_index, i + 1
-                ))
-        return tags
-
-    def __generate_number(self, word_list: list[Word]) -> list[Tag]:
-        tags = list()
-        for word in word_list:
-            try:
-                if word.word.endswith("f"):
-                    check_word = word.word[:-1]
-                else:
-                    check_word = word.word
-                float(check_word)
-                tags.append(self.create_tag(
-                    HighlighterMode.NUMBER, word.start, word.end
-                ))
-            except ValueError:
-                pass
-        return tags
-
-    def generate_tags(self, text) -> list[Tag]:
-        tags = list()
-        word_list = self.split_text(text)
-        line_list = self.split_line(text)
-        for rule, colour in self.rules.items():
-            if rule == HighlighterMode.KEYWORD:
-                tags.extend(self.__generate_keyword(word_list))
-            elif rule == HighlighterMode.TYPE:
-                tags.extend(self.__generate_type(word_list))
-            elif rule == HighlighterMode.NUMBER:
-                tags.extend(self.__generate_number(word_list))
-            elif rule == HighlighterMode.STRING:
-                tags.extend(self.__generate_string(text))
-            elif rule == HighlighterMode.MACRO:
-                tags.extend(self.__generate_macro(line_list))
-            elif rule == HighlighterMode.COMMENT:
-                tags.extend(self.__generate_comment(text))
-        return tags
+    @staticmethod
+    def get_indices(line_starts, base_line, starts, ends, multiline=False) -> list[str]:
+        # the line.column index of every start and end, one after the other. the
+        # line of an offset is the number of lines that start at or before it, and
+        # only a comment can end on a different line to the one it started on.
+        lines = list(map(bisect.bisect_right, repeat(line_starts), starts))
+        # lines count from 1, so with one more in front each line's start is at its
+        # own number.
+        numbered_starts = [0, *line_starts]
+        firsts = list(map(numbered_starts.__getitem__, lines))
+        end_lines, end_firsts = lines, firsts
+        if multiline:
+            end_lines = list(map(bisect.bisect_right, repeat(line_starts), ends))
+            end_firsts = map(numbered_starts.__getitem__, end_lines)
+        if base_line != 1:
+            lines = list(map((base_line - 1).__add__, lines))
+            end_lines = list(map((base_line - 1).__add__, end_lines)) if multiline else lines
+        # all of them formatted at once, rather than a string at a time.
+        values = [0] * (4 * len(starts))
+        values[0::4] = lines
+        values[1::4] = map(sub, starts, firsts)
+        values[2::4] = end_lines
+        values[3::4] = map(sub, ends, end_firsts)
+        return (("%d.%d %d.%d " * len(starts)) % tuple(values)).split()
+
+    def generate_tags(self, text, base="1.0") -> dict[HighlighterMode, list[str]]:
+        # for each mode, the start and end of every range of text it covers, ready
+        # to go to the text widget in one tag add.
+        rules = self.rules
+        base_line, base_column = (int(i) for i in base.split("."))
+
+        # where each line starts. the first one starts before the text does if base
+        # is part way through a line.
+        line_starts = list(accumulate(map((1).__add__, map(len, text.split("\n"))), initial=0))
+        line_starts[0] = -base_column
+
+        # the matches run on from each other, so the offset of each token is all
+        # the lengths before it added up. other than for macros, nothing here or
+        # below runs any python for each token, it is all maps over builtins.
+        pieces = get_tokens(text)
+        offsets = list(accumulate(map(len, chain.from_iterable(pieces)), initial=0))
+        tokens = list(map(itemgetter(1), pieces))
+
+        # the tokens grouped by kind, still in order within each kind.
+        kinds = list(map(WORD_KINDS.get, tokens, map(TOKEN_KINDS.get, map(itemgetter(0), tokens))))
+        order = sorted(range(len(tokens)), key=kinds.__getitem__)
+        token_starts = offsets[1::2]
+        token_ends = offsets[2::2]
+        starts = list(map(token_starts.__getitem__, order))
+        ends = list(map(token_ends.__getitem__, order))
+        groups = dict()
+        position = 0
+        for kind in sorted(set(kinds)):
+            count = kinds.count(kind)
+            groups[kind] = position, position + count
+            position += count
+
+        def get_group(kind):
+            start, end = groups.get(kind, (0, 0))
+            return starts[start:end], ends[start:end]
+
+        def get_indices(kind):
+            return self.get_indices(line_starts, base_line, *get_group(kind), multiline=(kind == "comment"))
+
+        ranges = dict()
+        for mode in (HighlighterMode.NUMBER, HighlighterMode.STRING, HighlighterMode.COMMENT):
+            if mode in rules:
+                ranges[mode] = get_indices(mode.value)
+
+        if HighlighterMode.KEYWORD in rules or HighlighterMode.TYPE in rules:
+            both = get_indices("keyword type")
+            for mode in (HighlighterMode.KEYWORD, HighlighterMode.TYPE):
+                if mode in rules:
+                    ranges[mode] = get_indices(mode.value) + both
+
+        if HighlighterMode.MACRO in rules:
+            # from the start of the line to the end of it, if the '#' is the first
+            # thing on its line.
+            macro_starts = list()
+            macro_ends = list()
+            for start, end in zip(*get_group("macro")):
+                line_start = max(line_starts[bisect.bisect_right(line_starts, start) - 1], 0)
+                if text[line_start:start].strip(" \t") == "":
+                    macro_starts.append(line_start)
+                    macro_ends.append(line_end_pattern.match(text, end).end())
+            ranges[HighlighterMode.MACRO] = self.get_indices(line_starts, base_line, macro_starts, macro_ends)
+
+        return ranges
 
     def generate_configs(self) -> list[Config]:
         configs = list()
@@ -291,8 +304,9 @@ class EditorPanel(ttk.Frame):
         self.scroll.pack(side=tk.RIGHT, fill=tk.Y)
         self.text.pack(expand=True, fill=tk.BOTH)
         self.highlighter = highlighter
-        if editable and highlighter is not None:
-            self.master.after(10000, self.__recolour_loop)
+        self.__dirty = False
+        if editable:
+            self.__install_proxy()
 
         def tab_pressed(event: tk.Event) -> str:
             self.text.insert(tk.INSERT, "    ")
@@ -319,20 +333,101 @@ class EditorPanel(ttk.Frame):
         return self.text.get("1.0", "end-1c")
 
     def __highlight(self):
-        for config in self.highlighter.generate_configs():
-            self.text.tag_configure(config.id.value, foreground=config.colour)
-
-        for tag in self.highlighter.generate_tags(str(self)):
-            self.text.tag_add(tag.id.value, tag.start, tag.end)
+        self.__dirty = False
+        self.__retag("1.0", tk.END, str(self))
 
     def highlight(self):
         if self.highlighter is None:
             return
         self.__guard(self.__highlight)
 
-    def __recolour_loop(self):
-        self.highlight()
-        self.master.after(10000, self.__recolour_loop)
+    def __retag(self, start, end, text):
+        for config in self.highlighter.generate_configs():
+            self.text.tag_configure(config.id.value, foreground=config.colour)
+            self.text.tag_remove(config.id.value, start, end)
+
+        # one tag add per kind of tag rather than one per word.
+        for mode, indices in self.highlighter.generate_tags(text, base=start).items():
+            if len(indices) > 0:
+                self.text.tag_add(mode.value, *indices)
+
+    def __install_proxy(self):
+        # the text widget's own command is renamed and replaced with __dispatch, so
+        # every insert and delete (typing, pasting, undo) comes through here with
+        # the range it touched. anything else interested in edits can bind <<Edited>>.
+        widget = str(self.text)
+        self.__original = widget + "_original"
+        self.tk.call("rename", widget, self.__original)
+        self.tk.createcommand(widget, self.__dispatch)
+
+    def __dispatch(self, command, *args):
+        if command not in ("insert", "delete", "replace"):
+            return self.tk.call(self.__original, command, *args)
+
+        start = str(self.tk.call(self.__original, "index", args[0]))
+        result = self.tk.call(self.__original, command, *args)
+
+        if command == "insert":
+            inserted = "".join(str(chars) for chars in args[1::2])
+        elif command == "replace":
+            inserted = "".join(str(chars) for chars in args[2::2])
+        else:
+            inserted = ""
+        if self.highlighter is not None:
+            self.__mark_dirty(start, f"{start}+{len(inserted)}c")
+        self.event_generate("<<Edited>>", when="tail")
+        return result
+
+    def __mark_dirty(self, start, end):
+        # marks move with the text, so a few edits between redraws just widen the range.
+        if not self.__dirty:
+            self.__dirty = True
+            self.text.mark_set("dirty_start", start)
+            self.text.mark_set("dirty_end", end)
+            self.text.mark_gravity("dirty_start", tk.LEFT)
+            self.text.mark_gravity("dirty_end", tk.RIGHT)
+            self.after_idle(self.__rehighlight)
+            return
+
+        if self.text.compare(start, "<", "dirty_start"):
+            self.text.mark_set("dirty_start", start)
+        if self.text.compare(end, ">", "dirty_end"):
+            self.text.mark_set("dirty_end", end)
+
+    def __extend_to_tags(self, start, end):
+        # an edit inside a comment or string can change the colour of all of it.
+        for tag_id in (HighlighterMode.COMMENT.value, HighlighterMode.STRING.value):
+            tag_range = self.text.tag_prevrange(tag_id, f"{start}+1c")
+            if tag_range and self.text.compare(tag_range[1], ">", start):
+                start = self.text.index(f"{tag_range[0]} linestart")
+            tag_range = self.text.tag_prevrange(tag_id, end)
+            if tag_range and self.text.compare(tag_range[1], ">", end):
+                end = self.text.index(f"{tag_range[1]} lineend")
+        return start, end
+
+    def __rehighlight(self):
+        if not self.__dirty:
+            return
+        self.__dirty = False
+
+        start = self.text.index("dirty_start linestart")
+        end = self.text.index("dirty_end lineend")
+        start, end = self.__extend_to_tags(start, end)
+        text = self.text.get(start, end)
+
+        # keep going until the range no longer leaves a comment or string open.
+        delimiter = self.highlighter.get_open_delimiter(text)
+        while delimiter is not None and self.text.compare(end, "<", "end-1c"):
+            found = self.text.search(delimiter, end, stopindex=tk.END)
+            if found:
+                end = self.text.index(f"{found}+{len(delimiter)}c lineend")
+            else:
+                end = self.text.index("end-1c")
+            start, end = self.__extend_to_tags(start, end)
+            text = self.text.get(start, end)
+            delimiter = self.highlighter.get_open_delimiter(text)
+
+        self.__retag(start, end, text)
 
     def clear(self):
         self.__guard(self.text.delete, "1.0", tk.END)
@@ -352,68 +447,26 @@ class CheckerResult:
 class Checker:
     def __init__(self, file_name, file_data):
         self.__file_name = file_name
-        self.__lines = file_data.split("\n")
+        self.__file_data = file_data
         self.__report: project_crawler.Report | None = None
 
     @staticmethod
-    def check_doxygen(report):
-        if report.doxygen_comment is None:
-            return False
-
-        if len(report.doxygen_comment) >= 3 and report.type != project_crawler.ReportType.FUNCTION:
-            return True
-
-        contain_dict = dict()
-        param_lines = [i for i in report.doxygen_comment if "@param" in i]
-        is_valid = True
-
-        for param in report.params:
-            for i, line in enumerate(param_lines):
-                if param.name in line:
-                    contain_dict[param.name] = i
-            if param.name not in contain_dict.keys() and param.name != "<unknown>":
-                contain_dict[param.name] = -1
-                is_valid = False
-
-        if report.returns == "exception":
-            contains_throws = False
-            for line in report.doxygen_comment:
-                if "@throws" in line and len(line) > len(" * @throws "):
-                    contains_throws = True
-                    break
-            if not contains_throws:
-                is_valid = False
-        elif report.returns == "tek_init":
-            if len(report.doxygen_comment) < 3:
-                is_valid = False
-        elif report.returns != "void":
-            contains_returns = False
-            for line in report.doxygen_comment:
-                if "@return" in line and len(line) > len(" * @return "):
-                    contains_returns = True
-                    break
-            if not contains_returns:
-                is_valid = False
-
-        return is_valid
+    def check_doxygen(report, file_lines=None):
+        return doxygen_parser.check_comment(report, doxygen_parser.read_comment(report, file_lines))
 
     @staticmethod
     def check_comment_ratio(report):
         if report.type != project_crawler.ReportType.FUNCTION:
             return True
-        len_doxygen = 0 if report.doxygen_comment is None else len(report.doxygen_comment)
-        return report.num_comments / (report.num_lines - len_doxygen) > 0.1
+        return report.num_comments / (report.num_lines - report.doxygen_lines) > 0.1
 
     def check(self):
-        for i in range(len(self.__lines)):
-            report = project_crawler.generate_function_report(self.__file_name, self.__lines, i)
-            if report is not None:
-                self.__report = report
-                len_doxygen = 0 if report.doxygen_comment is None else len(report.doxygen_comment)
-                return CheckerResult(
-                    doxygen=self.check_doxygen(report),
-                    comment_ratio=report.num_comments / (report.num_lines - len_doxygen)
-                )
+        for report in project_crawler.scan_file(self.__file_name, self.__file_data):
+            self.__report = report
+            return CheckerResult(
+                doxygen=self.check_doxygen(report, self.__file_data.split("\n")),
+                comment_ratio=report.num_comments / (report.num_lines - report.doxygen_lines)
+            )
         return None
 
     def generate_doxygen(self):
@@ -423,34 +476,37 @@ class Checker:
         if self.__report is None:
             return None
 
-        doxygen = "/**\n * \n"
-        for param in self.__report.params:
-            doxygen += f" * @param {param.name} \n"
-        if self.__report.returns == "exception":
-            doxygen += " * @throws \n"
-        elif self.__report.returns != "void":
-            doxygen += " * @return \n"
-        doxygen += " */\n"
-        return doxygen
+        return "".join(line + "\n" for line in doxygen_stubber.generate_stub(self.__report))
 
 class Window(tk.Tk):
     TITLE = "Comment Buggerer"
+    CHECK_DELAY = 300
 
-    def __init__(self, ignorefile="res/ignorefile.txt"):
+    def __init__(self, ignorefile="res/ignorefile.txt", use_cache=True, jobs=None):
         super().__init__()
         self.title(Window.TITLE)
         self.geometry("1280x720")
         self.running = False
         self.protocol("WM_DELETE_WINDOW", self.stop)
-        self.loader = threading.Thread(target=self.loader_target)
-        self.loaded = threading.Event()
-        self.already_loaded = False
+        self.loader = threading.Thread(target=self.loader_target, daemon=True)
+        self.bind("<<Loaded>>", self.on_loaded)
+        self.check_pool = ThreadPoolExecutor(max_workers=1)
+        self.check_future = None
+        self.check_job = None
+        self.check_digest = None
+        self.check_generation = 0
+        self.check_result = None
+        self.bind("<<Checked>>", self.on_checked)
         self.load_time = 0
+        self.load_profile = ""
         self.file_queue: list[project_crawler.Report] = list()
         self.active_file = ""
         self.active_func: project_crawler.Report | None = None
         self.active_checker = None
         self.num_functions = 0
+        self.journal = project_crawler.EditJournal()
+        self.cache = project_crawler.ReportCache() if use_cache else None
+        self.jobs = jobs
 
         highlighter = Highlighter()
         highlighter.add_rule(HighlighterMode.KEYWORD, Colour.KEYWORD)
@@ -461,22 +517,14 @@ class Window(tk.Tk):
         highlighter.add_rule(HighlighterMode.COMMENT, Colour.COMMENT)
 
         self.ignorefile = ignorefile
-        self.ignore: list[str] = list()
-
-        if not os.path.exists(self.ignorefile):
-            with open(self.ignorefile, "w"):
-                pass
-
-        with open(self.ignorefile) as f_ptr:
-            ignore = f_ptr.read().split("\n")
-            for line in ignore:
-                self.ignore.append(line)
+        self.ignore = project_crawler.IgnoreStore(self.ignorefile, PROJECT_ROOT)
 
         # main editor section
         self.editor = ttk.Frame(self)
 
         self.original = EditorPanel(self.editor, title="Original Code", highlighter=highlighter)
         self.final = EditorPanel(self.editor, title="Final Version", editable=True, highlighter=highlighter)
+        self.final.bind("<<Edited>>", self.schedule_check)
 
         self.original.grid(row=0, column=0, sticky="NSEW")
         self.final.grid(row=0, column=1, sticky="NSEW")
@@ -508,6 +556,8 @@ class Window(tk.Tk):
         self.base = ttk.Frame(self)
 
         self.load_label = ttk.Label(self.base, text="Loading file tree...")
+        self.splitter_profile = ttk.Separator(self.base, orient=tk.VERTICAL)
+        self.profile_label = ttk.Label(self.base)
         self.completion = ttk.Label(self.base)
         self.update_completion()
         self.splitter_a = ttk.Separator(self.base, orient=tk.VERTICAL)
@@ -518,6 +568,8 @@ class Window(tk.Tk):
         self.update_doxygen(False)
 
         self.load_label.pack(side=tk.LEFT)
+        self.splitter_profile.pack(side=tk.LEFT, fill=tk.Y, padx=5)
+        self.profile_label.pack(side=tk.LEFT)
         self.completion.pack(side=tk.RIGHT)
         self.splitter_a.pack(side=tk.RIGHT, fill=tk.Y, padx=5)
         self.ratio.pack(side=tk.RIGHT)
@@ -546,38 +598,44 @@ class Window(tk.Tk):
         self.doxygen.config(text=f"Doxygen: {"OK" if doxy_valid else "Invalid"}", foreground=colour)
 
     def loader_target(self):
-        curr_time = time.perf_counter_ns()
-        file_tree = project_crawler.generate_file_tree(project_root=os.path.expanduser("~/CLionProjects/TekPhysics/"))
+        # only the load is profiled, the checks made while editing run on another
+        # thread and would get tangled up with it.
+        profile = project_crawler.profile
+        profile.reset()
+        profile.enabled = True
 
-        def process_file(f_path):
-            f_data = project_crawler.read_file(f_path)
-            f_lines = f_data.split("\n")
-            for i in range(len(f_lines)):
-                report = project_crawler.generate_function_report(f_path, f_lines, i)
-                if report is None:
-                    continue
+        curr_time = time.perf_counter_ns()
+        # the project may well be on a network share, so the listings and reads are
+        # all started together and the files checked as they arrive.
+        with async_loader.AsyncLoader(jobs=self.jobs) as loader:
+            file_paths = loader.find_project_files(project_root=PROJECT_ROOT)
+            for file_path, reports, mapped in loader.iter_files(file_paths, self.cache):
+                for report in reports:
+                    if report in self.ignore:
+                        self.num_functions += 1
+                        continue
+
+                    with profile.phase("checks"):
+                        needs_work = not (Checker.check_comment_ratio(report) and Checker.check_doxygen(report, mapped))
+                    if needs_work:
+                        self.file_queue.append(report)
 
-                if project_crawler.generate_report_hash(report) in self.ignore:
                     self.num_functions += 1
-                    continue
 
-                if not (Checker.check_comment_ratio(report) and Checker.check_doxygen(report)):
-                    self.file_queue.append(report)
-
-                self.num_functions += 1
-
-        file_queue = list()
-        file_queue.append(file_tree)
-        while len(file_queue) > 0:
-            file_tree = file_queue.pop(-1)
-            for file_name, file_data in file_tree.items():
-                if type(file_data) == dict:
-                    file_queue.append(file_data)
-                else:
-                    process_file(file_data)
+        if self.cache is not None:
+            self.cache.save()
 
         self.load_time = (time.perf_counter_ns() - curr_time) / 1000000
-        self.loaded.set()
+        profile.enabled = False
+        self.load_profile = profile.format_summary()
+        # virtual events are the one thing that is safe to send to tk from another
+        # thread, and it gets picked up by mainloop like any other event.
+        try:
+            if self.running:
+                self.event_generate("<<Loaded>>", when="tail")
+        except (tk.TclError, RuntimeError):
+            # the window was closed before loading finished.
+            pass
 
     def copy_original(self):
         original_text = str(self.original)
@@ -585,16 +643,19 @@ class Window(tk.Tk):
 
     def advance_editor(self):
         if len(self.file_queue) == 0:
+            self.journal.flush()
             self.original.write("DONE!")
             self.final.write("DONE!")
             return
 
         self.active_func = self.file_queue.pop()
+        # the queue works through one file at a time, so moving on to the next file
+        # is when the accepted edits to the last one get written out.
+        if self.active_func.file != self.active_file:
+            self.journal.flush()
         self.active_file = self.active_func.file
-        with open(self.active_file) as f_ptr:
-            file_data = f_ptr.read()
-        file_lines = file_data.split("\n")
-        func_data = "\n".join(file_lines[self.active_func.start_line:self.active_func.start_line+self.active_func.num_lines])
+        func_lines = self.journal.read_lines(self.active_file, self.active_func.start_line, self.active_func.num_lines)
+        func_data = "\n".join(func_lines)
         self.original.write(func_data)
         self.final.clear()
         self.title(f"{Window.TITLE} | editing '{self.active_func.name}()' of '{os.path.basename(self.active_file)}'")
@@ -602,26 +663,21 @@ class Window(tk.Tk):
         self.active_checker = Checker(self.active_file, str(self.final))
 
     def ignore_func(self):
-        self.ignore.append(project_crawler.generate_report_hash(self.active_func))
+        self.ignore.add(self.active_func)
         self.advance_editor()
 
     def write_ignorefile(self):
-        with open(self.ignorefile, "w") as f_ptr:
-            f_ptr.write("\n".join(self.ignore))
+        self.ignore.compact()
 
     def overwrite_func(self):
-        with open(self.active_file, "r") as f_ptr:
-            file_data = f_ptr.read()
-
-        file_lines = file_data.split("\n")
         new_lines = str(self.final).split("\n")
-        final_lines = list()
-        final_lines.extend(file_lines[:self.active_func.start_line])
-        final_lines.extend(new_lines)
-        final_lines.extend(file_lines[self.active_func.start_line+self.active_func.num_lines:])
-
-        with open(self.active_file, "w") as f_ptr:
-            f_ptr.write("\n".join(final_lines))
+        self.journal.replace(
+            self.active_file,
+            self.active_func.start_line,
+            self.active_func.num_lines,
+            new_lines,
+            self.file_queue
+        )
 
     def insert_doxygen(self):
         if self.active_checker is None:
@@ -636,34 +692,66 @@ class Window(tk.Tk):
         self.advance_editor()
 
     def stop(self):
+        self.journal.flush()
         self.write_ignorefile()
         self.running = False
+        self.check_pool.shutdown(wait=False, cancel_futures=True)
+        self.destroy()
+
+    def on_loaded(self, event=None):
+        self.load_label.configure(text=f"Loaded file tree in {self.load_time:.1f}ms")
+        self.profile_label.configure(text=self.load_profile)
+        self.advance_editor()
+
+    def schedule_check(self, event=None):
+        # wait for a pause in typing rather than checking on every key.
+        if self.check_job is not None:
+            self.after_cancel(self.check_job)
+        self.check_job = self.after(Window.CHECK_DELAY, self.start_check)
+
+    def start_check(self):
+        self.check_job = None
+        file_data = str(self.final)
+        digest = project_crawler.hash_file_data(self.active_file + "\0" + file_data)
+        if digest == self.check_digest:
+            return
+        self.check_digest = digest
+
+        # an older check that hasn't started yet is dropped, and one that is already
+        # running has its result ignored when it comes back.
+        if self.check_future is not None:
+            self.check_future.cancel()
+        self.check_generation += 1
+        self.check_future = self.check_pool.submit(self.check_target, self.check_generation, self.active_file, file_data)
+
+    def check_target(self, generation, file_name, file_data):
+        checker = Checker(file_name, file_data)
+        result = checker.check()
+        self.check_result = (generation, checker, result)
+        try:
+            if self.running:
+                self.event_generate("<<Checked>>", when="tail")
+        except (tk.TclError, RuntimeError):
+            pass
+
+    def on_checked(self, event=None):
+        generation, checker, result = self.check_result
+        if generation != self.check_generation:
+            return
+
+        if result is not None:
+            self.update_doxygen(result.doxygen)
+            self.update_comment_ratio(result.comment_ratio)
+        else:
+            self.update_doxygen(False)
+            self.update_comment_ratio(0.0)
+        self.active_checker = checker
 
     def run(self):
-        self.loader.start()
         self.running = True
-        prev_time = time.perf_counter_ns()
-        while self.running:
-            if not self.already_loaded and self.loaded.is_set():
-                self.already_loaded = True
-                self.load_label.configure(text=f"Loaded file tree in {self.load_time:.1f}ms")
-                self.advance_editor()
-
-            curr_time = time.perf_counter_ns()
-            if curr_time >= prev_time + int(1e9):
-                prev_time = curr_time
-                checker = Checker(self.active_file, str(self.final))
-                result = checker.check()
-                if result is not None:
-                    self.update_doxygen(result.doxygen)
-                    self.update_comment_ratio(result.comment_ratio)
-                else:
-                    self.update_doxygen(False)
-                    self.update_comment_ratio(0.0)
-                self.active_checker = checker
-
-            self.update()
-            self.update_idletasks()
+        # started from inside mainloop so that the loaded event always has a loop to go to.
+        self.after_idle(self.loader.start)
+        self.mainloop()
 
 def main():
     window = Window()
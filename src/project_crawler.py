@@ -1,12 +1,25 @@
+import contextlib
+import csv
+import hashlib
+import io
 import json
+import mmap
 import os
 import re
-from dataclasses import dataclass
-from enum import Enum, auto
+import subprocess
+import sys
+import time
+from array import array
+from itertools import accumulate, repeat
+import operator
+import bisect
+from collections import deque
+from dataclasses import dataclass, asdict
+from enum import Enum, IntFlag, auto
 import argparse
-from more_itertools import unique_everseen
-from anytree import Node, RenderTree
-from anytree.exporter import DotExporter, UniqueDotExporter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import file_walker
+import file_watcher
 
 class ReportType(Enum):
     FUNCTION = auto()
@@ -15,23 +28,32 @@ class ReportType(Enum):
     TYPEDEF_STRUCT = auto()
     UNKNOWN = auto()
 
-@dataclass
+@dataclass(slots=True)
 class Parameter:
     type: str
     name: str
 
-@dataclass
+@dataclass(slots=True)
 class Report:
     file: str
     type: ReportType
     name: str
     params: list[Parameter]
     returns: str
-    doxygen_comment: list[str] | None
+    # the doxygen comment is the doxygen_lines lines from start_line on. read_doxygen
+    # gets it from the file's lines when it is needed rather than it being copied
+    # into every report, and it moves along with start_line when the file is edited.
+    doxygen_lines: int
     num_lines: int
     num_comments: int
     start_line: int
 
+    @property
+    def doxygen_range(self) -> tuple[int, int] | None:
+        if self.doxygen_lines == 0:
+            return None
+        return self.start_line, self.start_line + self.doxygen_lines
+
 @dataclass
 class ReportOptions:
     display_type: bool
@@ -45,10 +67,170 @@ class ReportOptions:
     warn_length: bool
     warn_only: bool
 
-class FunctionNode(Node):
-    def __init__(self, name, parent=None, children=None, **kwargs):
-        super().__init__(name, parent, children, **kwargs)
-        self.fillcolor = "white"
+class ProfilePhase:
+    __slots__ = ("profile", "name")
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.profile.enter(self.name)
+
+    def __exit__(self, *args):
+        self.profile.exit()
+
+# handed out instead of a ProfilePhase while profiling is off, so that timing a
+# phase costs next to nothing unless it was asked for.
+NO_PHASE = contextlib.nullcontext()
+
+class Profile:
+    # wall time and number of calls for each phase, plus running totals for whatever
+    # gets counted along the way. phases can be nested, and time spent in an inner
+    # phase is not counted again in the one around it, so the times add up.
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        self.times = dict()
+        self.calls = dict()
+        self.counters = dict()
+        self.stack = list()
+        self.last_time = 0
+        self.workers = 0
+
+    def phase(self, name):
+        if not self.enabled:
+            return NO_PHASE
+        return ProfilePhase(self, name)
+
+    def enter(self, name):
+        now = time.perf_counter_ns()
+        if len(self.stack) > 0:
+            parent = self.stack[-1]
+            self.times[parent] = self.times.get(parent, 0) + now - self.last_time
+        self.stack.append(name)
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.last_time = now
+
+    def exit(self):
+        now = time.perf_counter_ns()
+        name = self.stack.pop()
+        self.times[name] = self.times.get(name, 0) + now - self.last_time
+        self.last_time = now
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self):
+        return {"times": self.times, "calls": self.calls, "counters": self.counters}
+
+    def merge(self, snapshot):
+        for name, value in snapshot["times"].items():
+            self.times[name] = self.times.get(name, 0) + value
+        for name, value in snapshot["calls"].items():
+            self.calls[name] = self.calls.get(name, 0) + value
+        for name, value in snapshot["counters"].items():
+            self.counters[name] = self.counters.get(name, 0) + value
+        self.workers += 1
+
+    def get_phases(self) -> list[tuple[str, int, float]]:
+        phases = [(name, self.calls.get(name, 0), time_ns / 1000000) for name, time_ns in self.times.items()]
+        phases.sort(key=lambda p: p[2], reverse=True)
+        return phases
+
+    def format_table(self, wall_time=None) -> str:
+        phases = self.get_phases()
+        total_time = sum(p[2] for p in phases)
+        lines = [f"{"phase":<18}{"calls":>10}{"time":>12}{"share":>8}{"per call":>12}"]
+        for name, calls, phase_time in phases:
+            share = phase_time / total_time * 100 if total_time > 0 else 0.0
+            per_call = phase_time / calls * 1000 if calls > 0 else 0.0
+            lines.append(f"{name:<18}{calls:>10}{phase_time:>10.1f}ms{share:>7.1f}%{per_call:>10.1f}us")
+        lines.append(f"{"total":<18}{"":>10}{total_time:>10.1f}ms")
+        if wall_time is not None:
+            lines.append(f"{"wall":<18}{"":>10}{wall_time:>10.1f}ms")
+        if self.workers > 0:
+            lines.append("(scanning time is summed over the worker processes)")
+        if len(self.counters) > 0:
+            lines.append(", ".join(f"{name}: {value}" for name, value in sorted(self.counters.items())))
+        return "\n".join(lines)
+
+    def format_summary(self) -> str:
+        phases = ", ".join(f"{name} {phase_time:.0f}ms" for name, calls, phase_time in self.get_phases())
+        counters = self.counters
+        return f"{phases} | {counters.get("files", 0)} files, {counters.get("lines", 0)} lines, {counters.get("bytes", 0) / 1048576:.1f}MB"
+
+profile = Profile()
+
+class ReportTable:
+    # the same reports held a column at a time, for when a great many of them have
+    # to be kept around at once. a row is only turned back into a Report when it
+    # is asked for, so changes to that Report are not kept.
+    def __init__(self, reports=()):
+        self.files = list()
+        self.file_indices = dict()
+        self.file_column = array("I")
+        self.type_column = array("B")
+        self.names = list()
+        self.returns = list()
+        self.param_offsets = array("I", [0])
+        self.param_types = list()
+        self.param_names = list()
+        self.doxygen_lines = array("I")
+        self.num_lines = array("I")
+        self.num_comments = array("I")
+        self.start_lines = array("I")
+        self.extend(reports)
+
+    def append(self, report):
+        file_index = self.file_indices.get(report.file)
+        if file_index is None:
+            file_index = len(self.files)
+            self.file_indices[report.file] = file_index
+            self.files.append(sys.intern(report.file))
+        self.file_column.append(file_index)
+        self.type_column.append(report.type.value)
+        self.names.append(intern_name(report.name))
+        self.returns.append(sys.intern(report.returns))
+        for param in report.params:
+            self.param_types.append(sys.intern(param.type))
+            self.param_names.append(sys.intern(param.name))
+        self.param_offsets.append(len(self.param_types))
+        self.doxygen_lines.append(report.doxygen_lines)
+        self.num_lines.append(report.num_lines)
+        self.num_comments.append(report.num_comments)
+        self.start_lines.append(report.start_line)
+
+    def extend(self, reports):
+        for report in reports:
+            self.append(report)
+
+    def __len__(self):
+        return len(self.file_column)
+
+    def __getitem__(self, index) -> Report:
+        if index < 0:
+            index += len(self)
+        param_start = self.param_offsets[index]
+        param_end = self.param_offsets[index + 1]
+        return Report(
+            file=self.files[self.file_column[index]],
+            type=ReportType(self.type_column[index]),
+            name=self.names[index],
+            params=[Parameter(type=self.param_types[i], name=self.param_names[i]) for i in range(param_start, param_end)],
+            returns=self.returns[index],
+            doxygen_lines=self.doxygen_lines[index],
+            num_lines=self.num_lines[index],
+            num_comments=self.num_comments[index],
+            start_line=self.start_lines[index]
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
 
 def generate_report_hash(report):
     file = os.path.basename(report.file)
@@ -56,136 +238,591 @@ def generate_report_hash(report):
     line = report.start_line
     return f"{file}@{line}-{name}"
 
-macro_func_pattern = re.compile(
-    r'^\s*#define\s+([A-Za-z_]\w*)\s*\(([^)]*)\)',
-)
-
-func_pattern = re.compile(
-    r'^\s*'
-    r'(?:[A-Za-z_]\w*\s+){1,2}'
+def generate_report_fingerprint(report, project_root=None):
+    # unlike generate_report_hash this leaves out the line, so it survives edits
+    # elsewhere in the file. the file is given from the project root so that two
+    # files with the same name in different directories don't share entries, and
+    # only falls back to the bare file name when there is no root to go from.
+    if project_root is None:
+        file = os.path.basename(report.file)
+    else:
+        file = os.path.relpath(report.file, project_root).replace(os.sep, "/")
+    return f"{file}:{report.type.name}:{report.name}"
+
+def get_report_keys(report, project_root=None):
+    # every form an ignore entry for this report could have been written in, the
+    # current one first. entries from before fingerprints went by the path from
+    # the root (or before there were fingerprints at all) are still honoured.
+    keys = [generate_report_fingerprint(report, project_root)]
+    if project_root is not None:
+        keys.append(generate_report_fingerprint(report))
+    keys.append(generate_report_hash(report))
+    return keys
+
+def is_ignored(report, ignore, project_root=None) -> bool:
+    # ignore is either an IgnoreStore or a plain set of entries.
+    if isinstance(ignore, IgnoreStore):
+        return report in ignore
+    return any(key in ignore for key in get_report_keys(report, project_root))
+
+class IgnoreStore:
+    def __init__(self, ignore_file, project_root=None):
+        self.ignore_file = ignore_file
+        self.project_root = project_root
+        self.entries = set()
+        self.log = None
+        self.needs_newline = False
+
+        if os.path.exists(ignore_file):
+            with open(ignore_file, "r", encoding="utf-8") as f:
+                ignore_data = f.read()
+            for line in ignore_data.split("\n"):
+                if line != "":
+                    self.entries.add(line)
+            self.needs_newline = ignore_data != "" and not ignore_data.endswith("\n")
+
+    def __contains__(self, report):
+        return any(key in self.entries for key in get_report_keys(report, self.project_root))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, report):
+        fingerprint = generate_report_fingerprint(report, self.project_root)
+        if fingerprint in self.entries:
+            return
+        self.entries.add(fingerprint)
+
+        # appended as they come in, so nothing is lost if the session dies.
+        if self.log is None:
+            self.log = open(self.ignore_file, "a", encoding="utf-8")
+            if self.needs_newline:
+                self.log.write("\n")
+        self.log.write(fingerprint + "\n")
+        self.log.flush()
+
+    def compact(self):
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
+        temp_file = self.ignore_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            for entry in sorted(self.entries):
+                f.write(entry + "\n")
+        os.replace(temp_file, self.ignore_file)
+        self.needs_newline = False
+
+# every declaration kind in one pattern, so a file can be scanned in a single pass.
+# whitespace is [^\S\n] rather than \s so that no match ever runs past the end of
+# its line, and the alternatives are in priority order (macro, function, struct,
+# typedef struct), which is the order regex alternation tries them in. \w and \s
+# are ASCII only, the same as in the bytes patterns a MappedFile is scanned with,
+# so that both find the same declarations in the same file.
+declaration_alternatives = (
+    r'(?P<MACRO>#define[^\S\n]+([A-Za-z_]\w*)[^\S\n]*\(([^)\n]*)\))'
+    r'|(?P<FUNCTION>'
+    r'(?:[A-Za-z_]\w*[^\S\n]+){1,2}'
     r'(?!(?:if|while|for|switch|return|sizeof)\b)'
     r'([A-Za-z_]\w*)'
-    r'\s*\(([^)]*)\)\s*'
-    r'\{',
+    r'[^\S\n]*\(([^)\n]*)\)[^\S\n]*'
+    r'\{)'
+    r'|(?P<STRUCT>struct[^\S\n]+([A-Za-z_]\w*)[^\S\n]*\{([^}\n]*)})'
+    r'|(?P<TYPEDEF_STRUCT>typedef[^\S\n]+struct(?:[^\S\n]+([A-Za-z_]\w*))?[^\S\n]*\{([^}\n]*)})'
 )
-
-struct_pattern = re.compile(
-    r'^\s*struct\s+([A-Za-z_]\w*)\s*\{([^}]*)}',
-    re.DOTALL | re.MULTILINE
-)
-
-typedef_struct_pattern = re.compile(
-    r'^\s*typedef\s+struct(?:\s+([A-Za-z_]\w*))?\s*\{([^}]*)}',
-    re.DOTALL | re.MULTILINE
+declaration_pattern = re.compile(r'^[^\S\n]*(?:' + declaration_alternatives + r')', re.MULTILINE | re.ASCII)
+# for finding every declaration in a file. each match skips over whole lines by
+# itself until it gets to one that starts with a declaration, rather than the
+# search trying again at every character of every line that doesn't. the last
+# match runs to the end of the file without one and has no group.
+declaration_scan_pattern = re.compile(
+    r'(?:[^\n]*+\n)*?(?:^[^\S\n]*+(?:' + declaration_alternatives + r')|[^\n]*+\Z)',
+    re.MULTILINE | re.ASCII
 )
 
 PROJECT_ROOT = "../"
 SEARCH = ["core", "tekgl", "tekphys", "tekgui", "main.c", "tekgl.h"]
 
+def find_project_files(project_root=PROJECT_ROOT, file_filter=None, search=SEARCH) -> list[str]:
+    # only what is named in search is looked at directly under the root, the same
+    # as generate_file_tree, but the paths come back flat and already filtered.
+    if file_filter is None:
+        file_filter = file_walker.FileFilter()
+    with profile.phase("walk"):
+        return list(file_filter.walk(project_root, search))
+
 def get_path(root, *args):
     return os.path.abspath(os.path.join(root, *args))
 
 def read_file(file_path):
-    with open(file_path, "r", encoding="utf-8") as f:
-        file_data = f.read()
+    with profile.phase("read"):
+        with open(file_path, "r", encoding="utf-8") as f:
+            file_data = f.read()
     return file_data
 
+class MappedFile:
+    # read only view of a file through mmap, with the offset of the start of every
+    # line worked out once up front. a line or a range of lines is then just a slice
+    # of the buffer, and nothing else in the file gets copied or decoded.
+    def __init__(self, file_path, buffer=None, stat=None):
+        # a buffer that has already been read some other way can be given instead,
+        # along with the stat of the file it was read from if there is one.
+        self.file_path = file_path
+        self.stat = stat
+        if buffer is not None:
+            self.buffer = buffer
+        else:
+            with open(file_path, "rb") as f:
+                # taken from the file that is actually read, before it is, so that a
+                # cache entry never pairs newer mtime and size with older contents.
+                self.stat = os.fstat(f.fileno())
+                if self.stat.st_size == 0:
+                    self.buffer = b""
+                else:
+                    self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.line_offsets = array("Q", [0])
+        self.line_offsets.extend(match.end() for match in re.finditer(rb"\n", self.buffer))
+        # one past the end, as if the file finished with a newline, so that every
+        # line (the last one included) runs up to the next offset minus one.
+        self.line_offsets.append(len(self.buffer) + 1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+    def __len__(self):
+        return len(self.line_offsets) - 1
+
+    def __getitem__(self, line_number) -> str:
+        line = self.buffer[self.line_offsets[line_number]:self.line_offsets[line_number + 1] - 1]
+        # matches what reading in text mode would give for \r\n files.
+        return line.decode("utf-8").removesuffix("\r")
+
+    def get_lines(self, start_line, num_lines) -> list[str]:
+        end_line = min(start_line + num_lines, len(self))
+        if start_line >= end_line:
+            return list()
+        lines = self.buffer[self.line_offsets[start_line]:self.line_offsets[end_line] - 1]
+        return [line.removesuffix("\r") for line in lines.decode("utf-8").split("\n")]
+
+    def get_line_number(self, offset):
+        return bisect.bisect_right(self.line_offsets, offset) - 1
+
+    def hash(self):
+        return hashlib.sha1(self.buffer).hexdigest()
+
+def read_doxygen(report, file_lines=None) -> list[str] | None:
+    # file_lines can be anything indexed by line number, the list of lines or a
+    # MappedFile. without it the lines come straight from the file.
+    if report.doxygen_lines == 0:
+        return None
+    if file_lines is None:
+        with MappedFile(report.file) as mapped:
+            return mapped.get_lines(report.start_line, report.doxygen_lines)
+    return [file_lines[i] for i in range(report.start_line, report.start_line + report.doxygen_lines)]
+
+def iter_report_sources(reports):
+    # pairs every report up with its file, which is opened once for each run of
+    # reports that come from the same one.
+    mapped = None
+    try:
+        for report in reports:
+            if mapped is None or mapped.file_path != report.file:
+                if mapped is not None:
+                    mapped.close()
+                mapped = MappedFile(report.file)
+            yield report, mapped
+    finally:
+        if mapped is not None:
+            mapped.close()
+
+def hash_file(file_path):
+    with MappedFile(file_path) as mapped:
+        return mapped.hash()
+
+def write_file(file_path, file_data):
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write(file_data)
+
+class EditJournal:
+    def __init__(self):
+        self.files = dict()
+        self.dirty = set()
+
+    def get_lines(self, file_path) -> list[str]:
+        if file_path not in self.files:
+            self.files[file_path] = read_file(file_path).split("\n")
+        return self.files[file_path]
+
+    def read_lines(self, file_path, start_line, num_lines) -> list[str]:
+        # only files that have actually been edited are held in memory in full.
+        if file_path in self.files:
+            return self.files[file_path][start_line:start_line + num_lines]
+        with MappedFile(file_path) as mapped:
+            return mapped.get_lines(start_line, num_lines)
+
+    def replace(self, file_path, start_line, num_lines, new_lines, reports=()):
+        # edits are made to the lines held here and only written out by flush. any
+        # reports still waiting on the same file that sit below the edit are moved
+        # by however many lines it added or removed.
+        lines = self.get_lines(file_path)
+        end_line = start_line + num_lines
+        lines[start_line:end_line] = new_lines
+        self.dirty.add(file_path)
+
+        shift = len(new_lines) - num_lines
+        if shift == 0:
+            return
+        for report in reports:
+            if report.file == file_path and report.start_line >= end_line:
+                report.start_line += shift
+
+    def flush(self):
+        for file_path in self.dirty:
+            write_file(file_path, "\n".join(self.files[file_path]))
+        self.dirty.clear()
+        self.files.clear()
+
 def read_blacklist(file_path):
-    blacklist = list()
+    blacklist = set()
     with open(file_path, "r", encoding="utf-8") as f:
         for line in f:
             if line.startswith("#"):
                 continue
-            blacklist.append(line.strip())
+            blacklist.add(line.strip())
     return blacklist
 
 def generate_file_tree(project_root=PROJECT_ROOT):
-    root_file_tree = dict()
-    file_queue = list()
-    file_queue.append((project_root, root_file_tree))
-
-    first_pass_complete = False
-
-    while len(file_queue) > 0:
-        current_dir, file_tree = file_queue.pop(-1)
-        for loop_path_raw in os.listdir(current_dir):
-            if not first_pass_complete and not loop_path_raw in SEARCH:
-                continue
-            loop_path = get_path(current_dir, loop_path_raw)
-            if os.path.isdir(loop_path):
-                next_branch = dict()
-                file_tree[loop_path_raw] = next_branch
-                file_queue.append((loop_path, next_branch))
-            else:
-                file_tree[loop_path_raw] = loop_path
-        first_pass_complete = True
-
-    return root_file_tree
-
-def get_previous_comment(file_lines, end_line_number):
+    with profile.phase("walk"):
+        root_file_tree = dict()
+        file_queue = list()
+        file_queue.append((project_root, root_file_tree))
+
+        first_pass_complete = False
+
+        while len(file_queue) > 0:
+            current_dir, file_tree = file_queue.pop(-1)
+            for loop_path_raw in os.listdir(current_dir):
+                if not first_pass_complete and not loop_path_raw in SEARCH:
+                    continue
+                loop_path = get_path(current_dir, loop_path_raw)
+                if os.path.isdir(loop_path):
+                    next_branch = dict()
+                    file_tree[loop_path_raw] = next_branch
+                    file_queue.append((loop_path, next_branch))
+                else:
+                    file_tree[loop_path_raw] = loop_path
+            first_pass_complete = True
+
+        return root_file_tree
+
+def get_previous_comment_length(file_lines, end_line_number) -> int:
     if end_line_number < 0:
-        return None
+        return 0
 
     i = end_line_number
     line = file_lines[i]
 
     # make sure that there is actually some form of comment there.
     if not (line.endswith("*/") or line.startswith("///")):
-        return None
+        return 0
 
     # now iterate over lines until the start of the comment is reached.
-    comment_lines = list()
     while not (line.startswith("/**") or line.startswith("///")):
-        comment_lines.insert(0, line)
-
         i -= 1
         if i < 0:
-            return None
+            return 0
         line = file_lines[i]
 
-    comment_lines.insert(0, line)
-    return comment_lines
-
-def get_comment_ratio(file_lines, start_line_number, end_func=lambda l: l.startswith("}")):
-    i = start_line_number
-    line: str = file_lines[i]
-    num_comments = 0
-
-    while not end_func(line):
-        if "//" in line:
-            num_comments += 1
+    return end_line_number - i + 1
 
-        if i + 1 >= len(file_lines):
-            break
-        i += 1
-        line = file_lines[i]
-
-    if "//" in line:
-        num_comments += 1
-    i += 1
-    return i - start_line_number, num_comments
+def get_previous_comment(file_lines, end_line_number):
+    length = get_previous_comment_length(file_lines, end_line_number)
+    if length == 0:
+        return None
+    return [file_lines[i] for i in range(end_line_number - length + 1, end_line_number + 1)]
+
+class LineKind(IntFlag):
+    BLANK = 0
+    CODE = 1
+    LINE_COMMENT = 2
+    BLOCK_COMMENT = 4
+    PREPROCESSOR = 8
+    # ends in a backslash, so the line after it carries straight on from it.
+    CONTINUED = 16
+
+CODE = int(LineKind.CODE)
+LINE_COMMENT = int(LineKind.LINE_COMMENT)
+BLOCK_COMMENT = int(LineKind.BLOCK_COMMENT)
+PREPROCESSOR = int(LineKind.PREPROCESSOR)
+CONTINUED = int(LineKind.CONTINUED)
+COMMENT_LINE = LINE_COMMENT | BLOCK_COMMENT
+
+# maps a line's kind to 1 if it counts as a comment or code line and 0 if not.
+COMMENT_TABLE = bytes(1 if kind & COMMENT_LINE else 0 for kind in range(256))
+CODE_TABLE = bytes(1 if kind & CODE else 0 for kind in range(256))
+
+# the only things that matter for working out where comments and blocks start and
+# end, each one paired with everything in front of it since the last. strings and
+# characters are part of what is skipped, so nothing inside them is taken for a
+# token, and so is a / that doesn't start a comment or a # that isn't a
+# conditional directive. nothing has to be done in python for what is skipped,
+# and because the pieces run on from each other without a gap, every token's
+# offset is just the sum of their lengths. the empty match at the end stops the
+# search from starting again at every character after the last token.
+line_token_pattern = re.compile(
+    r'((?:[^/"\'{}#]++'
+    r'|"[^"\\\n]*+(?:\\.[^"\\\n]*+)*+"?'
+    r'|\'[^\'\\\n]*+(?:\\.[^\'\\\n]*+)*+\'?'
+    r'|/(?![/*])'
+    r'|\#(?![^\S\n]*+(?:if|ifdef|ifndef|elif|else|endif)\b))*+)'
+    r'(//[^\n]*+'
+    r'|/\*[^*]*+(?:\*++[^*/][^*]*+)*+(?:\*++/|\Z)'
+    r'|\#[^\S\n]*+(?P<directive>if|ifdef|ifndef|elif|else|endif)\b'
+    r'|[{}]'
+    r'|\Z)',
+    re.DOTALL | re.ASCII
+)
+mapped_line_token_pattern = re.compile(line_token_pattern.pattern.encode("utf-8"), re.DOTALL)
+
+# roughly how much of the file is classified at a time, rounded up to a whole line.
+CLASSIFY_BLOCK_SIZE = 1 << 14
+
+class LineIndex:
+    # where every comment is and the line each top level brace is closed on, which
+    # is where a function or struct declared on that line ends, found in one pass.
+    # which lines have code on them is only worked out a block at a time as far
+    # down the file as has been asked about, since most of it never is.
+    # file_data can be a str, bytes or an mmap, which is searched where it is
+    # rather than copied. file_lines, the list of lines or a MappedFile, lets a
+    # line be looked at without classifying everything above it.
+    def __init__(self, file_data, file_lines=None):
+        if isinstance(file_data, str):
+            pattern = line_token_pattern
+            self.empty, self.newline, self.directive, self.backslash = "", "\n", "#", "\\"
+            open_brace, close_brace, line_comment = "{", "}", "//"
+        else:
+            pattern = mapped_line_token_pattern
+            self.empty, self.newline, self.directive, self.backslash = b"", b"\n", b"#", b"\\"
+            open_brace, close_brace, line_comment = b"{", b"}", b"//"
+        newline = self.newline
+        self.file_data = file_data
+        self.file_lines = file_lines
+        self.block_ends = dict()
+        # lines that start with a closing brace, for when the braces don't match up.
+        self.closing_lines = list()
+        self.comment_spans = list()
+
+        # the line each token is on is the number of newlines in every piece before
+        # it, and only a block comment has any inside the token itself.
+        skipped, tokens, directives = zip(*pattern.findall(file_data))
+        skipped_lines = map(type(newline).count, skipped, repeat(newline))
+        token_ends = list(accumulate(map(operator.add, map(len, skipped), map(len, tokens))))
+        token_starts = list(map(operator.sub, token_ends, map(len, tokens)))
+
+        line = 0
+        comment_lines = list()
+        open_lines = list()
+        last_open_line = -1
+        # one entry for each #if the pass is inside of, true once it has got past
+        # the first branch. braces are only counted in the first branch of each,
+        # so that the two halves of an #ifdef/#else don't both open a block.
+        conditionals = list()
+        num_skipped = 0
+        for num_lines, token, name, start, end in zip(skipped_lines, tokens, directives, token_starts, token_ends):
+            line += num_lines
+            if token == open_brace:
+                if num_skipped > 0:
+                    continue
+                # only the first brace opened on a line is the one a declaration
+                # on that line would have opened.
+                open_lines.append(line if line != last_open_line else -1)
+                last_open_line = line
+            elif token == close_brace:
+                if num_skipped > 0:
+                    continue
+                if start == 0 or file_data[start - 1:start] == newline:
+                    self.closing_lines.append(line)
+                if len(open_lines) > 0:
+                    open_line = open_lines.pop()
+                    if open_line >= 0:
+                        self.block_ends.setdefault(open_line, line)
+            elif name:
+                if file_data[file_data.rfind(newline, 0, start) + 1:start].strip() != self.empty:
+                    continue
+                if name in ("if", "ifdef", "ifndef", b"if", b"ifdef", b"ifndef"):
+                    conditionals.append(False)
+                elif len(conditionals) == 0:
+                    continue
+                elif name in ("endif", b"endif"):
+                    num_skipped -= conditionals.pop()
+                elif not conditionals[-1]:
+                    conditionals[-1] = True
+                    num_skipped += 1
+            elif token.startswith(line_comment):
+                comment_lines.append((line, line, LINE_COMMENT))
+                self.comment_spans.append((start, end))
+            elif token:
+                end_line = line + token.count(newline)
+                comment_lines.append((line, end_line, BLOCK_COMMENT))
+                self.comment_spans.append((start, end))
+                line = end_line
+
+        # the last token is the empty one at the end of the file, so line is now the
+        # last line.
+        kinds = bytearray(line + 1)
+        for start_line, end_line, kind in comment_lines:
+            for i in range(start_line, end_line + 1):
+                kinds[i] |= kind
+
+        self.kinds = kinds
+        self.num_classified = 0
+        self.classified_end = 0
+        self.span_index = 0
+        self.continued = False
+
+    def classify(self, end_line):
+        # which lines have any code on them once the comments are taken out, down to
+        # at least end_line. each comment becomes just the newlines inside it so that
+        # the lines still line up, and it is done a block at a time so that only
+        # that much of the file is ever copied.
+        file_data, kinds = self.file_data, self.kinds
+        comment_spans, newline = self.comment_spans, self.newline
+        num_spans = len(comment_spans)
+        while self.num_classified < min(end_line, len(kinds)):
+            position = self.classified_end
+            end = file_data.find(newline, position + CLASSIFY_BLOCK_SIZE)
+            if end < 0:
+                end = len(file_data)
+            code_pieces = list()
+            j = self.span_index
+            while j < num_spans and comment_spans[j][0] < end:
+                span_start = max(comment_spans[j][0], position)
+                span_end = min(comment_spans[j][1], end)
+                code_pieces.append(file_data[position:span_start])
+                code_pieces.append(newline * file_data[span_start:span_end].count(newline))
+                position = span_end
+                j += 1
+            code_pieces.append(file_data[position:end])
+            # the last comment might carry on into the next block.
+            self.span_index = j - 1 if j > 0 and comment_spans[j - 1][1] > end else j
+
+            continued = self.continued
+            code_lines = self.empty.join(code_pieces).split(newline)
+            for i, code_line in enumerate(code_lines, self.num_classified):
+                code_line = code_line.strip()
+                if not code_line:
+                    if continued:
+                        kinds[i] |= PREPROCESSOR
+                        continued = False
+                    continue
+                if continued or code_line.startswith(self.directive):
+                    kinds[i] |= PREPROCESSOR
+                else:
+                    kinds[i] |= CODE
+                continued = code_line.endswith(self.backslash)
+                if continued:
+                    kinds[i] |= CONTINUED
+            self.continued = continued
+            self.num_classified += len(code_lines)
+            self.classified_end = end + 1
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def get_kind(self, line_number) -> LineKind:
+        self.classify(line_number + 1)
+        return LineKind(self.kinds[line_number])
+
+    def count_comments(self, start_line, end_line) -> int:
+        # comments are known from the first pass, so they never need classifying.
+        return self.kinds[start_line:end_line].translate(COMMENT_TABLE).count(1)
+
+    def count_code(self, start_line, end_line) -> int:
+        self.classify(end_line)
+        return self.kinds[start_line:end_line].translate(CODE_TABLE).count(1)
+
+    def get_end_line(self, line_number, report_type) -> int:
+        # the last line of whatever is declared on line_number. a macro runs on for
+        # as long as its lines are continued, and anything else up to the brace that
+        # closes the one opened on its first line, or the end of the file if that
+        # never comes.
+        if report_type == ReportType.MACRO:
+            i = line_number
+            while i + 1 < len(self.kinds) and self.is_continued(i):
+                i += 1
+            return i
+        end_line = self.block_ends.get(line_number)
+        if end_line is not None:
+            return end_line
+        # the brace it opened was never closed, so go to the next line that starts
+        # with one, or failing that the end of the file.
+        i = bisect.bisect_right(self.closing_lines, line_number)
+        if i < len(self.closing_lines):
+            return self.closing_lines[i]
+        return len(self.kinds) - 1
+
+    def is_continued(self, line_number) -> bool:
+        # whether a line is continued only depends on the line itself, so one
+        # without a comment in it doesn't have to be classified to know.
+        if self.file_lines is not None and not self.kinds[line_number] & COMMENT_LINE:
+            return self.file_lines[line_number].rstrip().endswith("\\")
+        self.classify(line_number + 1)
+        return bool(self.kinds[line_number] & CONTINUED)
+
+    def get_comment_ratio(self, line_number, report_type) -> tuple[int, int]:
+        end_line = self.get_end_line(line_number, report_type) + 1
+        return end_line - line_number, self.count_comments(line_number, end_line)
+
+def get_declaration_data(match):
+    report_type = ReportType[match.lastgroup]
+    return report_type, match.group(match.lastindex + 1), match.group(match.lastindex + 2)
 
 def get_function_data(line):
-    macro_func_match = macro_func_pattern.match(line)
-    func_match = func_pattern.match(line)
-    struct_match = struct_pattern.match(line)
-    typedef_struct_match = typedef_struct_pattern.match(line)
-    if macro_func_match:
-        report_type = ReportType.MACRO
-        match = macro_func_match
-    elif func_match:
-        report_type = ReportType.FUNCTION
-        match = func_match
-    elif struct_match:
-        report_type = ReportType.STRUCT
-        match = struct_match
-    elif typedef_struct_match:
-        report_type = ReportType.TYPEDEF_STRUCT
-        match = typedef_struct_match
-    else:
+    match = declaration_pattern.match(line)
+    if match is None:
         return None
+    return get_declaration_data(match)
+
+# the same pattern over bytes, for scanning a MappedFile without decoding it.
+mapped_declaration_pattern = re.compile(declaration_scan_pattern.pattern.encode("utf-8"), re.MULTILINE)
 
-    return report_type, match.group(1), match.group(2)
+def iter_mapped_declarations(mapped):
+    for match in mapped_declaration_pattern.finditer(mapped.buffer):
+        if match.lastgroup is None:
+            continue
+        report_type = ReportType[match.lastgroup]
+        report_name = match.group(match.lastindex + 1)
+        report_args = match.group(match.lastindex + 2)
+        if report_name is not None:
+            report_name = report_name.decode("utf-8")
+        yield mapped.get_line_number(match.start(match.lastindex)), (report_type, report_name, report_args.decode("utf-8"))
+
+def iter_declarations(file_data):
+    # walks the whole file once, tracking the line number as it goes rather than
+    # matching every line against every pattern.
+    line_number = 0
+    line_start = 0
+    for match in declaration_scan_pattern.finditer(file_data):
+        if match.lastgroup is None:
+            continue
+        start = match.start(match.lastindex)
+        line_number += file_data.count("\n", line_start, start)
+        line_start = start
+        yield line_number, get_declaration_data(match)
+
+def intern_name(name):
+    # anonymous typedefs don't have a name to intern.
+    if name is None:
+        return None
+    return sys.intern(name)
 
 def process_params(params) -> list[Parameter]:
     split_params = params.split(",")
@@ -207,18 +844,30 @@ def process_params(params) -> list[Parameter]:
             p_name = "<unknown>"
 
         parameters.append(Parameter(
-            type=p_type,
-            name=p_name
+            type=sys.intern(p_type),
+            name=sys.intern(p_name)
         ))
     return parameters
 
-def generate_function_report(file_name, file_lines, function_line_number):
-    line = file_lines[function_line_number]
+# the lines generate_function_report was last given and the LineIndex made from
+# them, so that calling it for every line of a file only indexes the file once.
+function_report_index = [None, None]
 
-    function_data = get_function_data(line)
+def generate_function_report(file_name, file_lines, function_line_number, line_index=None):
+    function_data = get_function_data(file_lines[function_line_number])
     if function_data is None:
         return None
-
+    if line_index is None:
+        # the lines are compared rather than the list, so one that has been edited
+        # in place since is indexed again.
+        lines = list(file_lines)
+        if function_report_index[0] != lines:
+            function_report_index[:] = lines, LineIndex("\n".join(lines), lines)
+        line_index = function_report_index[1]
+    return build_function_report(file_name, file_lines, function_line_number, function_data, line_index)
+
+def build_function_report(file_name, file_lines, function_line_number, function_data, line_index):
+    line = file_lines[function_line_number]
     report_type, report_name, report_args = function_data
 
     report_return = ""
@@ -230,48 +879,303 @@ def generate_function_report(file_name, file_lines, function_line_number):
                 report_return = split_line[i - 1]
                 break
 
-    doxygen_comment = get_previous_comment(file_lines, function_line_number - 1)
-    if doxygen_comment is not None:
-        len_doxygen_comment = len(doxygen_comment)
-    else:
-        len_doxygen_comment = 0
-    if report_type == ReportType.MACRO:
-        num_lines, num_comments = get_comment_ratio(file_lines, function_line_number, end_func=lambda l: not l.endswith("\\"))
-    else:
-        num_lines, num_comments = get_comment_ratio(file_lines, function_line_number)
+    with profile.phase("previous_comment"):
+        len_doxygen_comment = get_previous_comment_length(file_lines, function_line_number - 1)
+    with profile.phase("comment_ratio"):
+        num_lines, num_comments = line_index.get_comment_ratio(function_line_number, report_type)
 
     return Report(
-        file=file_name,
+        file=sys.intern(file_name),
         type=report_type,
-        name=report_name,
+        name=intern_name(report_name),
         params=process_params(report_args),
-        returns=report_return,
-        doxygen_comment=doxygen_comment,
+        returns=sys.intern(report_return),
+        doxygen_lines=len_doxygen_comment,
         num_lines=num_lines + len_doxygen_comment,
         num_comments=num_comments,
         start_line=function_line_number - len_doxygen_comment
     )
 
+def scan_file(file_name, file_data) -> list[Report]:
+    with profile.phase("scan"):
+        file_lines = file_data.split("\n")
+        profile.count("files")
+        profile.count("lines", len(file_lines))
+        profile.count("bytes", len(file_data))
+        with profile.phase("match"):
+            declarations = list(iter_declarations(file_data))
+        with profile.phase("classify"):
+            line_index = LineIndex(file_data, file_lines)
+        reports = list()
+        for line_number, function_data in declarations:
+            reports.append(build_function_report(file_name, file_lines, line_number, function_data, line_index))
+        profile.count("reports", len(reports))
+        return reports
+
+def scan_mapped(file_name, mapped) -> list[Report]:
+    # the MappedFile stands in for the list of lines, so only the lines a report
+    # actually looks at are ever decoded.
+    with profile.phase("scan"):
+        with profile.phase("match"):
+            declarations = list(iter_mapped_declarations(mapped))
+        with profile.phase("classify"):
+            line_index = LineIndex(mapped.buffer, mapped)
+        reports = list()
+        for line_number, function_data in declarations:
+            reports.append(build_function_report(file_name, mapped, line_number, function_data, line_index))
+        profile.count("reports", len(reports))
+        return reports
+
+CACHE_FILE = ".crawler_cache.json"
+CACHE_VERSION = 5
+CACHE_MAX_FILES = 20000
+
+def report_to_dict(report):
+    report_dict = asdict(report)
+    report_dict["type"] = report.type.name
+    return report_dict
+
+def report_from_dict(report_dict):
+    return Report(
+        file=sys.intern(report_dict["file"]),
+        type=ReportType[report_dict["type"]],
+        name=intern_name(report_dict["name"]),
+        params=[Parameter(type=sys.intern(param["type"]), name=sys.intern(param["name"])) for param in report_dict["params"]],
+        returns=sys.intern(report_dict["returns"]),
+        doxygen_lines=report_dict["doxygen_lines"],
+        num_lines=report_dict["num_lines"],
+        num_comments=report_dict["num_comments"],
+        start_line=report_dict["start_line"]
+    )
+
+def hash_file_data(file_data):
+    if isinstance(file_data, str):
+        file_data = file_data.encode("utf-8")
+    return hashlib.sha1(file_data).hexdigest()
+
+class ReportCache:
+    def __init__(self, cache_file=CACHE_FILE, max_files=CACHE_MAX_FILES):
+        self.cache_file = cache_file
+        self.max_files = max_files
+        self.files = dict()
+        self.load()
+
+    def load(self):
+        try:
+            with profile.phase("cache"), open(self.cache_file, "r", encoding="utf-8") as f:
+                cache_data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        # anything written by another version is just thrown away and rebuilt.
+        if not isinstance(cache_data, dict) or cache_data.get("version") != CACHE_VERSION:
+            return
+        self.files = cache_data["files"]
+
+    def save(self):
+        if len(self.files) > self.max_files:
+            entries = sorted(self.files.items(), key=lambda e: e[1]["used"], reverse=True)
+            self.files = dict(entries[:self.max_files])
+
+        temp_file = self.cache_file + ".tmp"
+        with profile.phase("cache"), open(temp_file, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "files": self.files}, f)
+        os.replace(temp_file, self.cache_file)
+
+    def contains(self, file_path) -> bool:
+        entry = self.files.get(file_path)
+        if entry is None:
+            return False
+
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+
+        if stat.st_size != entry["size"]:
+            return False
+
+        # touched but maybe not changed, so fall back to comparing the contents.
+        if stat.st_mtime_ns != entry["mtime"]:
+            if hash_file(file_path) != entry["hash"]:
+                return False
+            entry["mtime"] = stat.st_mtime_ns
+
+        return True
+
+    def lookup(self, file_path) -> list[Report] | None:
+        with profile.phase("cache"):
+            if not self.contains(file_path):
+                return None
+
+            entry = self.files[file_path]
+            entry["used"] = time.time()
+            profile.count("cache_hits")
+            return [report_from_dict(report_dict) for report_dict in entry["reports"]]
+
+    def lookup_hash(self, file_path, file_hash) -> list[Report] | None:
+        # for a file that has already been read, so the contents can be compared
+        # without going back to the disk.
+        with profile.phase("cache"):
+            entry = self.files.get(file_path)
+            if entry is None or entry["hash"] != file_hash:
+                return None
+
+            entry["used"] = time.time()
+            profile.count("cache_hits")
+            return [report_from_dict(report_dict) for report_dict in entry["reports"]]
+
+    def store(self, file_path, file_hash, reports, stat=None):
+        # stat should come from when the file was read. looking it up now could
+        # pick up a change made since, which would then never be noticed.
+        if stat is None:
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                return
+
+        self.files[file_path] = {
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "hash": file_hash,
+            "used": time.time(),
+            "reports": [report_to_dict(report) for report in reports]
+        }
+
+    def get_reports(self, file_path) -> list[Report]:
+        reports = self.lookup(file_path)
+        if reports is not None:
+            return reports
+
+        file_hash, stat, reports = scan_path(file_path)
+        self.store(file_path, file_hash, reports, stat)
+        return reports
+
+def get_file_reports(file_path, cache=None) -> list[Report]:
+    if cache is not None:
+        return cache.get_reports(file_path)
+    return scan_path(file_path)[2]
+
+def scan_path(file_path):
+    with profile.phase("read"):
+        mapped = MappedFile(file_path)
+    with mapped:
+        profile.count("files")
+        profile.count("lines", len(mapped))
+        profile.count("bytes", len(mapped.buffer))
+        with profile.phase("hash"):
+            file_hash = mapped.hash()
+        return file_hash, mapped.stat, scan_mapped(file_path, mapped)
+
+def scan_buffer(file_path, file_data):
+    # the same as scan_path, for a file that has already been read into memory.
+    mapped = MappedFile(file_path, file_data)
+    profile.count("files")
+    profile.count("lines", len(mapped))
+    profile.count("bytes", len(file_data))
+    return scan_mapped(file_path, mapped)
+
+def profile_scan_buffer(file_path, file_data):
+    profile.reset()
+    profile.enabled = True
+    return scan_buffer(file_path, file_data), profile.snapshot()
+
+def profile_scan_path(file_path):
+    # run in a worker process, which has a profile of its own that the results
+    # have to be carried back from.
+    profile.reset()
+    profile.enabled = True
+    return scan_path(file_path), profile.snapshot()
+
+def get_file_size(file_path):
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return 0
+
+def iter_file_reports(file_paths, cache=None, jobs=1):
+    # reports are only ever held for the file being yielded (plus whatever the
+    # pool has finished ahead of it), so callers can stop early or stream them on.
+    file_paths = list(file_paths)
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+
+    if cache is not None:
+        pending = [file_path for file_path in file_paths if not cache.contains(file_path)]
+    else:
+        pending = file_paths
+
+    if jobs <= 1 or len(pending) <= 1:
+        for file_path in file_paths:
+            yield file_path, get_file_reports(file_path, cache)
+        return
+
+    executor = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        # hand out the biggest files first so that one large file doesn't end
+        # up being started last, but give the results back in the original order.
+        futures = dict()
+        for file_path in sorted(pending, key=get_file_size, reverse=True):
+            if profile.enabled:
+                futures[file_path] = executor.submit(profile_scan_path, file_path)
+            else:
+                futures[file_path] = executor.submit(scan_path, file_path)
+
+        for file_path in file_paths:
+            if file_path in futures:
+                if profile.enabled:
+                    (file_hash, stat, reports), snapshot = futures.pop(file_path).result()
+                    profile.merge(snapshot)
+                else:
+                    file_hash, stat, reports = futures.pop(file_path).result()
+                if cache is not None:
+                    cache.store(file_path, file_hash, reports, stat)
+            else:
+                reports = get_file_reports(file_path, cache)
+            yield file_path, reports
+    finally:
+        # stops any files that haven't been started if the caller gave up early.
+        executor.shutdown(cancel_futures=True)
+
+def iter_reports(project_root=PROJECT_ROOT, include=None, exclude=None, ignore=None, cache=None, jobs=1):
+    file_paths = find_project_files(project_root, file_walker.FileFilter(include=include, exclude=exclude))
+    for file_path, reports in iter_file_reports(file_paths, cache, jobs):
+        for report in reports:
+            if ignore is not None and is_ignored(report, ignore, project_root):
+                continue
+            yield report
+
 MIN_RATIO = 0.1
 MAX_RATIO = 0.4
 MAX_LENGTH = 60
 
-def display_function_report(report: Report, report_options: ReportOptions):
-    display = False
-    comment_ratio = report.num_comments / report.num_lines
+def get_warnings(report: Report, report_options: ReportOptions) -> list[str]:
+    with profile.phase("checks"):
+        warnings = list()
 
-    if report_options.warn_only:
-        if report_options.warn_doxygen and report.doxygen_comment is None:
-            display = True
+        if report_options.warn_doxygen:
+            if report.doxygen_lines == 0:
+                warnings.append("WARNING: Function does not have a doxygen comment")
 
-        if report_options.warn_comment_ratio and (comment_ratio < MIN_RATIO or comment_ratio > MAX_RATIO):
-            display = True
+        if report_options.warn_comment_ratio:
+            comment_ratio = report.num_comments / report.num_lines
+            if comment_ratio < MIN_RATIO:
+                warnings.append("WARNING: Function may be underdocumented")
+            elif comment_ratio > MAX_RATIO:
+                warnings.append("WARNING: Function may be overdocumented")
 
-        if report_options.warn_length and report.num_lines > MAX_LENGTH:
-            display = True
+        if report_options.warn_length:
+            if report.num_lines > MAX_LENGTH:
+                warnings.append("WARNING: Function may be too long")
 
-        if not display:
-            return False
+        return warnings
+
+def display_function_report(report: Report, report_options: ReportOptions, file_lines=None):
+    warnings = get_warnings(report, report_options)
+
+    if report_options.warn_only and len(warnings) == 0:
+        return False
 
     if report_options.display_name:
         print(f"Function Name: {report.name}")
@@ -283,8 +1187,9 @@ def display_function_report(report: Report, report_options: ReportOptions):
         print(f"Function Params:\n{report.params}")
 
     if report_options.display_doxygen:
-        if report.doxygen_comment is not None:
-            print(f"Doxygen Comment:\n{'\n'.join(report.doxygen_comment)}")
+        doxygen_comment = read_doxygen(report, file_lines)
+        if doxygen_comment is not None:
+            print(f"Doxygen Comment:\n{'\n'.join(doxygen_comment)}")
         else:
             print("Doxygen Comment: None")
 
@@ -294,67 +1199,200 @@ def display_function_report(report: Report, report_options: ReportOptions):
     if report_options.display_comment_ratio:
         print(f"Comment Ratio: {report.num_comments / report.num_lines}")
 
-    if report_options.warn_doxygen:
-        if report.doxygen_comment is None:
-            print("WARNING: Function does not have a doxygen comment")
-
-    if report_options.warn_comment_ratio:
-        comment_ratio = report.num_comments / report.num_lines
-        if comment_ratio < 0.1:
-            print("WARNING: Function may be underdocumented")
-        elif comment_ratio > 0.4:
-            print("WARNING: Function may be overdocumented")
-
-    if report_options.warn_length:
-        if report.num_lines > 60:
-            print("WARNING: Function may be too long")
+    for warning in warnings:
+        print(warning)
 
     return True
 
-def process_file(file_path, report_options):
-    file_data = read_file(file_path)
-    file_lines = file_data.split("\n")
-    for i in range(len(file_lines)):
-        report = generate_function_report(file_path, file_lines, i)
-        if report is None:
-            continue
-        if display_function_report(report, report_options):
-            print("")
-
-def generate_project_data(file_tree, report_options):
-    file_queue = list()
-    file_queue.append(file_tree)
-    while len(file_queue) > 0:
-        file_tree = file_queue.pop(-1)
-        for file_name, file_data in file_tree.items():
-            if type(file_data) == dict:
-               file_queue.append(file_data)
-            else:
-                print(f"-------------------------------- {file_data}")
-                process_file(file_data, report_options)
+def process_file(file_path, report_options, cache=None):
+    display_file_reports(file_path, get_file_reports(file_path, cache), report_options)
 
-def line_has_function(line, function_name):
-    if function_name + "(" in line:
-        return True
-    if function_name + ")" in line:
-        return True
-    if function_name + ";" in line:
-        return True
-    if function_name + "," in line:
-        return True
-    return False
+def display_reports(reports, report_options, file_lines=None):
+    with profile.phase("output"):
+        for report in reports:
+            if display_function_report(report, report_options, file_lines):
+                print("")
+
+def display_file_reports(file_path, reports, report_options):
+    # the file only has to be opened if the doxygen comments are being shown.
+    if report_options.display_doxygen and len(reports) > 0:
+        with MappedFile(file_path) as mapped:
+            display_reports(reports, report_options, mapped)
+    else:
+        display_reports(reports, report_options)
+
+def list_files(file_tree) -> list[str]:
+    with profile.phase("walk"):
+        file_queue = list()
+        file_queue.append(file_tree)
+        file_list = list()
+        while len(file_queue) > 0:
+            file_tree = file_queue.pop(-1)
+            for file_name, file_data in file_tree.items():
+                if type(file_data) == dict:
+                    file_queue.append(file_data)
+                else:
+                    file_list.append(file_data)
+        return file_list
+
+def generate_project_data(file_paths, report_options, cache=None, jobs=1):
+    for file_path, reports in iter_file_reports(file_paths, cache, jobs):
+        with profile.phase("output"):
+            print(f"-------------------------------- {file_path}")
+        display_file_reports(file_path, reports, report_options)
+
+OUTPUT_FORMATS = ["text", "jsonl", "csv"]
+OUTPUT_BUFFER_SIZE = 1 << 16
+CSV_FIELDS = ["file", "type", "name", "returns", "params", "start_line", "num_lines", "num_comments", "comment_ratio", "doxygen_lines", "warnings"]
+
+def report_to_record(report, warnings, doxygen_comment=None) -> dict:
+    record = {
+        "file": report.file,
+        "type": report.type.name,
+        "name": report.name,
+        "returns": report.returns,
+        "params": [{"type": param.type, "name": param.name} for param in report.params],
+        "start_line": report.start_line,
+        "num_lines": report.num_lines,
+        "num_comments": report.num_comments,
+        "comment_ratio": report.num_comments / report.num_lines,
+        "doxygen_lines": report.doxygen_lines,
+        "warnings": warnings
+    }
+    if doxygen_comment is not None:
+        record["doxygen"] = doxygen_comment
+    return record
+
+def record_to_row(record) -> dict:
+    # csv has no lists, so those are joined up into one cell each.
+    row = dict(record)
+    row["params"] = ", ".join(f"{param["type"]} {param["name"]}" for param in record["params"])
+    row["warnings"] = "; ".join(record["warnings"])
+    if "doxygen" in record:
+        row["doxygen"] = "\n".join(record["doxygen"])
+    return row
+
+def open_output():
+    # stdout is only line buffered when it is a terminal, and records go out one
+    # line at a time, so this gives them a large buffer of their own instead.
+    sys.stdout.flush()
+    return open(sys.stdout.fileno(), "w", encoding="utf-8", newline="", buffering=OUTPUT_BUFFER_SIZE, closefd=False)
+
+def write_project_data(file_paths, report_options, output_format, cache=None, jobs=1, f=None):
+    close_output = f is None
+    if f is None:
+        f = open_output()
+
+    if output_format == "csv":
+        fields = CSV_FIELDS + ["doxygen"] if report_options.display_doxygen else CSV_FIELDS
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+
+    try:
+        for file_path, reports in iter_file_reports(file_paths, cache, jobs):
+            mapped = MappedFile(file_path) if report_options.display_doxygen and len(reports) > 0 else None
+            try:
+                with profile.phase("output"):
+                    for report in reports:
+                        warnings = get_warnings(report, report_options)
+                        if report_options.warn_only and len(warnings) == 0:
+                            continue
+
+                        doxygen_comment = None
+                        if mapped is not None:
+                            doxygen_comment = read_doxygen(report, mapped) or list()
+                        record = report_to_record(report, warnings, doxygen_comment)
+
+                        if output_format == "csv":
+                            writer.writerow(record_to_row(record))
+                        else:
+                            f.write(json.dumps(record))
+                            f.write("\n")
+            finally:
+                if mapped is not None:
+                    mapped.close()
+    finally:
+        if close_output:
+            f.close()
+        else:
+            f.flush()
+
+def collect_warnings(reports, report_options) -> set[tuple[str, str, str]]:
+    # keyed on name rather than line so that edits above a function don't make
+    # all of its warnings look new.
+    warnings = set()
+    for report in reports:
+        for warning in get_warnings(report, report_options):
+            warnings.add((report.type.name, str(report.name), warning))
+    return warnings
+
+def get_search_roots(project_root=PROJECT_ROOT, search=SEARCH):
+    if search is None:
+        return [get_path(project_root)]
+    roots = list()
+    for name in search:
+        root = get_path(project_root, name)
+        if os.path.exists(root):
+            roots.append(root)
+    return roots
+
+def watch_project(project_root, report_options, cache=None, jobs=1, file_filter=None, search=SEARCH):
+    if file_filter is None:
+        file_filter = file_walker.FileFilter()
+
+    file_warnings = dict()
+    for file_path, reports in iter_file_reports(find_project_files(project_root, file_filter, search), cache, jobs):
+        print(f"-------------------------------- {file_path}")
+        display_file_reports(file_path, reports, report_options)
+        file_warnings[file_path] = collect_warnings(reports, report_options)
+
+    if cache is not None:
+        cache.save()
+
+    watcher = file_watcher.create_watcher(get_search_roots(project_root, search), project_root, search, file_filter)
+    print(f"Watching {len(file_warnings)} files for changes...")
+
+    try:
+        while True:
+            # the watcher only gives back files that file_filter would have found.
+            for file_path in sorted(watcher.wait()):
+                try:
+                    warnings = collect_warnings(get_file_reports(file_path, cache), report_options)
+                except (OSError, UnicodeDecodeError):
+                    # deleted, or not something that could be parsed in the first place.
+                    warnings = set()
+
+                old_warnings = file_warnings.get(file_path, set())
+                for report_type, name, warning in sorted(warnings - old_warnings):
+                    print(f"+ {file_path}: {name} ({report_type}) {warning}")
+                for report_type, name, warning in sorted(old_warnings - warnings):
+                    print(f"- {file_path}: {name} ({report_type}) {warning}")
+                file_warnings[file_path] = warnings
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        if cache is not None:
+            cache.save()
+
+# a call site is any identifier directly followed by one of these characters. a
+# known function is used on a line if it is a suffix of one of these identifiers,
+# which is the same thing as its name plus the character appearing in the line.
+call_pattern = re.compile(r'(\w+)[(),;]')
+
+def index_function_usage(file, function_names, blacklist) -> dict[str, list[str]]:
+    declarations = dict()
+    for line_number, function_data in iter_declarations(file):
+        if function_data[0] == ReportType.FUNCTION:
+            declarations[line_number] = function_data[1]
 
-def find_function_usage(file, function_name, blacklist) -> list[str]:
-    file_lines = file.split("\n")
     current_function = None
-    usage = list()
+    usage = dict()
 
-    for i, line in enumerate(file_lines):
-        function_data = get_function_data(line)
-        new_data = False
-        if function_data is not None and function_data[0] == ReportType.FUNCTION:
-            current_function = function_data[1]
-            new_data = True
+    for i, line in enumerate(file.split("\n")):
+        if i in declarations:
+            current_function = declarations[i]
+            continue
 
         if current_function is None:
             continue
@@ -367,70 +1405,218 @@ def find_function_usage(file, function_name, blacklist) -> list[str]:
         if line.startswith("#define"):
             continue
 
-        if new_data:
-            continue
-
-        if line_has_function(line, function_name):
-            if function_name != current_function:
-                usage.append((i, current_function))
+        for match in call_pattern.finditer(line):
+            word = match.group(1)
+            for start in range(len(word)):
+                function_name = word[start:]
+                if function_name in function_names and function_name != current_function:
+                    # dict rather than set so callers stay in order of first use
+                    usage.setdefault(function_name, dict())[current_function] = None
 
-    usage.sort(key=lambda u: u[0])
-    usage = [u[1] for u in usage]
-    return list(unique_everseen(usage))
+    return {function_name: list(callers) for function_name, callers in usage.items()}
 
-def display_function_list(function_call_stack, function_dict, sub_functions, split_functions, depth=0, parent=None):
-    function_name = function_call_stack[-1]
-    # print(f"{"  " * depth}{function_name}")
-    for function in function_dict[function_name]:
-        if function in function_call_stack:
-            Node("Recursive call.red", parent=parent)
+def find_function_usage(file, function_name, blacklist) -> list[str]:
+    return index_function_usage(file, {function_name}, blacklist).get(function_name, list())
+
+def quote_dot(text):
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+class CallGraph:
+    # the call graph drawn as a graph rather than a tree, so a function that can be
+    # reached along many paths is only drawn once per image instead of once per
+    # path. what each function calls, and the line that draws it, are worked out
+    # once and shared between every image the function turns up in.
+    def __init__(self, function_dict, sub_functions, split_functions):
+        self.function_dict = function_dict
+        self.sub_functions = set(sub_functions)
+        self.split_functions = set(split_functions)
+        self.children = dict()
+        self.node_lines = dict()
+
+    def get_colour(self, function):
+        if function in self.sub_functions:
+            return "lightblue"
+        if function in self.split_functions:
+            return "lightgreen"
+        return "white"
+
+    def get_children(self, function) -> list[str]:
+        children = self.children.get(function)
+        if children is None:
+            children = list(dict.fromkeys(self.function_dict.get(function, ())))
+            self.children[function] = children
+        return children
+
+    def get_node_line(self, function, truncated=False) -> str:
+        key = (function, truncated)
+        node_line = self.node_lines.get(key)
+        if node_line is None:
+            style = "\"filled,dashed\"" if truncated else "filled"
+            node_line = f"    {quote_dot(function)} [shape=box, style={style}, fillcolor={self.get_colour(function)}, label={quote_dot(function)}];\n"
+            self.node_lines[key] = node_line
+        return node_line
+
+    def collect(self, root, max_depth=None):
+        # breadth first, so every function sits at the shallowest depth it can be
+        # reached at. sub and split functions get an image of their own, so they
+        # are only expanded when they are the root.
+        depths = {root: 0}
+        expanded = list()
+        queue = deque()
+        queue.append(root)
+        while len(queue) > 0:
+            function = queue.popleft()
+            depth = depths[function]
+            if function != root and (function in self.sub_functions or function in self.split_functions):
+                continue
+            if max_depth is not None and depth >= max_depth:
+                continue
+            expanded.append(function)
+            for child in self.get_children(function):
+                if child not in depths:
+                    depths[child] = depth + 1
+                    queue.append(child)
+        return depths, expanded
+
+    def find_recursive_calls(self, root, expanded) -> set[tuple[str, str]]:
+        # a call back to a function that is still on the stack, which is what the
+        # tree used to draw as a "Recursive call" node.
+        expanded = set(expanded)
+        recursive_calls = set()
+        if root not in expanded:
+            return recursive_calls
+
+        visited = {root}
+        on_stack = {root}
+        stack = [(root, iter(self.get_children(root)))]
+        while len(stack) > 0:
+            function, children = stack[-1]
+            for child in children:
+                if child in on_stack:
+                    recursive_calls.add((function, child))
+                elif child in expanded and child not in visited:
+                    visited.add(child)
+                    on_stack.add(child)
+                    stack.append((child, iter(self.get_children(child))))
+                    break
+            else:
+                stack.pop()
+                on_stack.discard(function)
+        return recursive_calls
+
+    def write_dot(self, f, root, max_depth=None):
+        depths, expanded = self.collect(root, max_depth)
+        recursive_calls = self.find_recursive_calls(root, expanded)
+        expanded_set = set(expanded)
+
+        f.write("digraph tree {\n")
+        for function in depths.keys():
+            # cut off by the depth limit rather than having nothing more to show.
+            truncated = (
+                max_depth is not None
+                and function not in expanded_set
+                and depths[function] >= max_depth
+                and function not in self.sub_functions
+                and function not in self.split_functions
+                and len(self.get_children(function)) > 0
+            )
+            f.write(self.get_node_line(function, truncated))
+        for function in expanded:
+            for child in self.get_children(function):
+                colour = "red" if (function, child) in recursive_calls else "gray"
+                f.write(f"    {quote_dot(function)} -> {quote_dot(child)} [color={colour}];\n")
+        f.write("}\n")
+
+def render_dot(dot_file, picture_file):
+    subprocess.run(["dot", dot_file, "-T", os.path.splitext(picture_file)[1][1:], "-o", picture_file], check=True)
+
+RENDER_MANIFEST = "render_hashes.json"
+
+def load_render_manifest(manifest_file) -> dict[str, str]:
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return dict()
+    return manifest if isinstance(manifest, dict) else dict()
+
+def render_call_graphs(graph, roots, output_dir="hierarchy", max_depth=None, jobs=None):
+    # each image is only redrawn if the graph going into it has changed since it
+    # was last drawn, and the ones that have are handed to dot all at once.
+    manifest_file = os.path.join(output_dir, RENDER_MANIFEST)
+    old_manifest = load_render_manifest(manifest_file)
+    manifest = dict()
+    pending = list()
+
+    for root in dict.fromkeys(roots):
+        dot_buffer = io.StringIO()
+        graph.write_dot(dot_buffer, root, max_depth)
+        dot_data = dot_buffer.getvalue()
+        dot_hash = hash_file_data(dot_data)
+        dot_file = os.path.join(output_dir, f"{root}.dot")
+        picture_file = os.path.join(output_dir, f"{root}.png")
+
+        manifest[root] = dot_hash
+        if old_manifest.get(root) == dot_hash and os.path.exists(picture_file):
             continue
-        if function in sub_functions:
-            Node(f"{function}.lightblue", parent=parent)
-        elif function in split_functions:
-            Node(f"{function}.lightgreen", parent=parent)
-        else:
-            child = Node(f"{function}.white", parent=parent)
-            display_function_list((*function_call_stack, function), function_dict, sub_functions, split_functions, depth=depth+1, parent=child)
-
-def generate_function_list(file_tree, blacklist_file="blacklist.txt"):
-    file_queue = list()
-    file_list = list()
-    file_queue.append(file_tree)
-
+        write_file(dot_file, dot_data)
+        pending.append((root, dot_file, picture_file))
+
+    error = None
+    if len(pending) > 0:
+        # dot does the work in a process of its own, so threads are enough to keep
+        # every core busy.
+        with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as executor:
+            futures = [(root, executor.submit(render_dot, dot_file, picture_file)) for root, dot_file, picture_file in pending]
+            for root, future in futures:
+                try:
+                    future.result()
+                except (OSError, subprocess.CalledProcessError) as e:
+                    # left out of the manifest so that it is tried again next time.
+                    del manifest[root]
+                    if error is None:
+                        error = e
+
+    temp_file = manifest_file + ".tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(temp_file, manifest_file)
+
+    if error is not None:
+        raise error
+    return len(pending)
+
+def generate_function_list(file_paths, blacklist_file="blacklist.txt"):
     if blacklist_file is None:
-        blacklist = list()
+        blacklist = set()
     else:
         blacklist = read_blacklist(blacklist_file)
 
-    while len(file_queue) > 0:
-        file_tree = file_queue.pop(-1)
-        for file_name, file_data in file_tree.items():
-            if type(file_data) == dict:
-                file_queue.append(file_data)
-            else:
-                file_list.append((file_data, read_file(file_data)))
+    file_list = [(file_path, read_file(file_path)) for file_path in file_paths]
 
     function_dict = dict()
     function_count = dict()
     for file_name, file in file_list:
-        file_lines = file.split("\n")
-        for i in range(len(file_lines)):
-            line = file_lines[i]
-            function_data = get_function_data(line)
-            if function_data is None:
-                continue
+        for line_number, function_data in iter_declarations(file):
             function_dict[function_data[1]] = list()
             function_count[function_data[1]] = 0
 
+    # every file is tokenised once against every known function, and the usage is
+    # collected per function in file order, as checking each function against each
+    # file in turn would have.
+    function_names = {function for function in function_dict.keys() if function not in blacklist}
+    function_usage = dict()
+    for file_name, file in file_list:
+        for function, usage in index_function_usage(file, function_names, blacklist).items():
+            function_usage.setdefault(function, list()).extend(usage)
+
     for function in function_dict.keys():
         if function in blacklist:
             continue
-        for file_name, file in file_list:
-            usage = find_function_usage(file, function, blacklist)
-            for use in usage:
-                function_dict[use].append(function)
-            function_count[function] += len(usage)
+        usage = function_usage.get(function, list())
+        for use in usage:
+            function_dict[use].append(function)
+        function_count[function] += len(usage)
 
     with open("function_dict.json", "w") as function_dict_file:
         json.dump(function_dict, function_dict_file)
@@ -438,23 +1624,7 @@ def generate_function_list(file_tree, blacklist_file="blacklist.txt"):
     with open("function_count.json", "w") as function_count_file:
         json.dump(function_count, function_count_file)
 
-    # root = Node("TekPhysics")
-
-    # display_function_list(("main",), function_dict, parent=root)
-    # UniqueDotExporter(root).to_dotfile("hierarchy.dot")
-
-# Node styling function
-def mynode(node):
-    # Example: color and shape based on the node name
-    name, colour = node.name.split(".")
-    dot = f"shape=box, style=filled, fillcolor={colour}, label=\"{name}\""
-    return dot
-
-# Edge styling (optional)
-def myedge(parent, child):
-    return 'color=gray'   # simple example
-
-def generate_function_list_from_cache():
+def generate_function_list_from_cache(max_depth=None, jobs=None):
     function_dict = None
     function_count = None
     with open("function_dict.json", "r") as function_dict_file:
@@ -483,31 +1653,8 @@ def generate_function_list_from_cache():
 
         sub_functions.append(function)
 
-    root = Node("main.white")
-    display_function_list(("main",), function_dict, sub_functions, split_functions, parent=root)
-    UniqueDotExporter(
-        root,
-        nodeattrfunc=mynode,
-        edgeattrfunc=myedge
-    ).to_picture("hierarchy/main.png")
-
-    for sub_function in sub_functions:
-        root = Node(f"{sub_function}.lightblue")
-        display_function_list((sub_function,), function_dict, sub_functions, split_functions, parent=root)
-        UniqueDotExporter(
-            root,
-            nodeattrfunc=mynode,
-            edgeattrfunc=myedge
-        ).to_picture(f"hierarchy/{sub_function}.png")
-
-    for sub_function in split_functions:
-        root = Node(f"{sub_function}.lightgreen")
-        display_function_list((sub_function,), function_dict, sub_functions, split_functions, parent=root)
-        UniqueDotExporter(
-            root,
-            nodeattrfunc=mynode,
-            edgeattrfunc=myedge
-        ).to_picture(f"hierarchy/{sub_function}.png")
+    graph = CallGraph(function_dict, sub_functions, split_functions)
+    render_call_graphs(graph, ["main", *sub_functions, *split_functions], "hierarchy", max_depth, jobs)
 
 """
     display_type: bool
@@ -537,8 +1684,24 @@ def main():
     parser.add_argument("-wc", "--warn_comments", action="store_true")
     parser.add_argument("-wl", "--warn_length", action="store_true")
     parser.add_argument("-wo", "--warn_only", action="store_true")
+    parser.add_argument("--no_cache", action="store_true")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--watch", action="store_true")
+    parser.add_argument("--profile", action="store_true")
+    parser.add_argument("-f", "--format", choices=OUTPUT_FORMATS, default="text")
+    parser.add_argument("--root", default=PROJECT_ROOT)
+    parser.add_argument("--search", nargs="*", default=SEARCH)
+    parser.add_argument("--ext", nargs="*", default=file_walker.SOURCE_EXTENSIONS)
+    parser.add_argument("--include", nargs="+", default=None)
+    parser.add_argument("--exclude", nargs="+", default=None)
+    parser.add_argument("--no_gitignore", action="store_true")
 
     args = parser.parse_args()
+    if args.watch and args.format != "text":
+        parser.error("--watch only reports changes as text")
+
+    start_time = time.perf_counter_ns()
+    profile.enabled = args.profile
 
     report_options = ReportOptions(
         display_type=args.type,
@@ -553,7 +1716,29 @@ def main():
         warn_only=args.warn_only
     )
 
-    generate_project_data(generate_file_tree(), report_options)
+    # an empty --search looks at everything under the root, and an empty --ext
+    # lets through files of any kind.
+    search = args.search if len(args.search) > 0 else None
+    extensions = args.ext if len(args.ext) > 0 else None
+    file_filter = file_walker.FileFilter(extensions, args.include, args.exclude, not args.no_gitignore)
+
+    try:
+        cache = None if args.no_cache else ReportCache()
+        if args.watch:
+            watch_project(args.root, report_options, cache, args.jobs, file_filter, search)
+            return
+
+        file_paths = find_project_files(args.root, file_filter, search)
+        if args.format == "text":
+            generate_project_data(file_paths, report_options, cache, args.jobs)
+        else:
+            write_project_data(file_paths, report_options, args.format, cache, args.jobs)
+        if cache is not None:
+            cache.save()
+    finally:
+        if args.profile:
+            # kept off stdout so that it doesn't end up mixed into the report.
+            print(profile.format_table((time.perf_counter_ns() - start_time) / 1000000), file=sys.stderr)
 
 if __name__ == "__main__":
     # main()
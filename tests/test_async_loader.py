@@ -0,0 +1,116 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import async_loader
+
+# roughly a round trip to a file server on the same network.
+NETWORK_LATENCY = 0.002
+
+class SlowFileSystem(async_loader.LocalFileSystem):
+    # the local disk with a wait in front of every listing and read, to stand in
+    # for a project checked out on a network share.
+    def __init__(self, latency=NETWORK_LATENCY):
+        self.latency = latency
+
+    def list_dir(self, path):
+        time.sleep(self.latency)
+        return super().list_dir(path)
+
+    def read_file(self, path):
+        time.sleep(self.latency)
+        return super().read_file(path)
+
+class VanishingFileSystem(SlowFileSystem):
+    # a directory that is deleted while the one it is in is being listed, so it
+    # is gone by the time the loader gets to it.
+    def __init__(self, vanishing_dir, latency=NETWORK_LATENCY):
+        super().__init__(latency)
+        self.vanishing_dir = vanishing_dir
+
+    def list_dir(self, path):
+        entries = super().list_dir(path)
+        if path == os.path.dirname(self.vanishing_dir):
+            shutil.rmtree(self.vanishing_dir, ignore_errors=True)
+        return entries
+
+SOURCE = """\
+int {0}(int a) {{
+    return a;
+}}
+"""
+
+FILES = [
+    "main.c",
+    "core/list.c",
+    "core/list.h",
+    "core/deep/tree.c",
+    "tekgl/shader.c",
+    ".git/hook.c",
+    "ignored/skip.c",
+]
+
+class AsyncLoaderTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        for i, file_name in enumerate(FILES):
+            file_path = os.path.join(self.root, file_name)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(SOURCE.format(f"function_{i}"))
+        with open(os.path.join(self.root, ".gitignore"), "w", encoding="utf-8") as f:
+            f.write("ignored/\n")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def load(self, fs, file_paths=None):
+        with async_loader.AsyncLoader(fs, concurrency=4) as loader:
+            if file_paths is None:
+                file_paths = loader.find_project_files(self.root, search=None)
+            loaded = list()
+            for file_path, reports, mapped in loader.iter_files(file_paths):
+                loaded.append((file_path, reports, bytes(mapped.buffer)))
+            return file_paths, loaded
+
+    def test_slow_matches_local(self):
+        local_paths, local_files = self.load(async_loader.LocalFileSystem())
+        slow_paths, slow_files = self.load(SlowFileSystem())
+        self.assertEqual(slow_paths, local_paths)
+        self.assertEqual(slow_files, local_files)
+        # .git and the gitignored tree are left out the same way by both.
+        self.assertEqual(
+            sorted(os.path.relpath(file_path, self.root).replace(os.sep, "/") for file_path in slow_paths),
+            ["core/deep/tree.c", "core/list.c", "core/list.h", "main.c", "tekgl/shader.c"]
+        )
+
+    def test_unreadable_file(self):
+        # a file that goes between being found and being read fails the read, after
+        # everything in front of it has been given back.
+        with async_loader.AsyncLoader(SlowFileSystem(), concurrency=4) as loader:
+            file_paths = loader.find_project_files(self.root, search=None)
+            os.remove(file_paths[2])
+            loaded = list()
+            with self.assertRaises(FileNotFoundError):
+                for file_path, reports, mapped in loader.iter_files(file_paths):
+                    loaded.append(file_path)
+        self.assertEqual(loaded, file_paths[:2])
+
+    def test_vanished_directory(self):
+        # a directory that can no longer be listed is skipped, and everything else
+        # is still found.
+        vanishing_dir = os.path.join(self.root, "core", "deep")
+        file_paths, loaded = self.load(VanishingFileSystem(vanishing_dir))
+        self.assertFalse(os.path.exists(vanishing_dir))
+        local_paths, local_files = self.load(async_loader.LocalFileSystem())
+        self.assertEqual(file_paths, local_paths)
+        self.assertEqual(loaded, local_files)
+
+if __name__ == "__main__":
+    unittest.main()
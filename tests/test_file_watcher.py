@@ -0,0 +1,65 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import file_walker
+import file_watcher
+
+FILES = [
+    "main.c",
+    "notes.txt",
+    "core/list.c",
+    "core/list.h",
+    "core/generated/table.c",
+    "core/.git/hook.c",
+    "tekgl/shader.c",
+    ".git/objects/pack.c",
+    "build/out.c",
+]
+
+class WatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        for file_name in FILES:
+            file_path = os.path.join(self.root, file_name)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write("int x;\n")
+        # ignored from above the roots that are watched, so walking from a root
+        # alone wouldn't know about it.
+        with open(os.path.join(self.root, ".gitignore"), "w", encoding="utf-8") as f:
+            f.write("build/\ngenerated/\n")
+        self.names = ["core", "tekgl", "main.c"]
+        self.roots = [os.path.join(self.root, name) for name in self.names]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def get_crawled(self, names):
+        return set(file_walker.FileFilter().walk(self.root, names))
+
+    def test_polling_matches_walk(self):
+        watcher = file_watcher.PollingWatcher(self.roots, self.root, self.names)
+        self.assertEqual(set(watcher.files), self.get_crawled(self.names))
+        self.assertEqual(
+            sorted(os.path.relpath(file_path, self.root).replace(os.sep, "/") for file_path in watcher.files),
+            ["core/list.c", "core/list.h", "main.c", "tekgl/shader.c"]
+        )
+
+    def test_whole_project(self):
+        watcher = file_watcher.PollingWatcher([self.root], self.root)
+        self.assertEqual(set(watcher.files), self.get_crawled(None))
+
+    def test_accepts(self):
+        watcher = file_watcher.PollingWatcher(self.roots, self.root, self.names)
+        self.assertTrue(watcher.accepts(os.path.join(self.root, "core", "new.c")))
+        self.assertFalse(watcher.accepts(os.path.join(self.root, "core", "new.txt")))
+        self.assertFalse(watcher.accepts(os.path.join(self.root, "core", "generated"), True))
+        self.assertFalse(watcher.accepts(os.path.join(self.root, "core", ".git"), True))
+
+if __name__ == "__main__":
+    unittest.main()
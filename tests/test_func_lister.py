@@ -0,0 +1,80 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import func_lister
+import project_crawler
+
+SOURCE = """\
+int first(int a) {
+    return a;
+}
+
+int second(int b) {
+    return b;
+}
+"""
+
+class ProcessFileTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, "test.c")
+        with open(self.file_path, "w", encoding="utf-8") as f:
+            f.write(SOURCE)
+        first = project_crawler.get_file_reports(self.file_path)[0]
+        self.hashes = [project_crawler.generate_report_hash(first)]
+        self.fingerprints = [project_crawler.generate_report_fingerprint(first)]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def get_names(self, ignore):
+        reports = list()
+        func_lister.process_file(self.file_path, reports, ignore)
+        return [report.name for report in reports]
+
+    def test_ignore_kinds(self):
+        # a list, a set and an IgnoreStore of the same entries all ignore the same
+        # reports.
+        store = project_crawler.IgnoreStore(os.path.join(self.temp_dir.name, "ignorefile.txt"))
+        store.entries.update(self.fingerprints)
+        for ignore in (self.hashes, set(self.hashes), self.fingerprints, set(self.fingerprints), store):
+            self.assertEqual(self.get_names(ignore), ["second"])
+
+    def test_nothing_ignored(self):
+        self.assertEqual(self.get_names(set()), ["first", "second"])
+
+DESCRIPTIONS = [func_lister.Description("first", "The first one.", None, "int", "test.c")]
+
+class BackendTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_failed_render_keeps_output(self):
+        for backend_name in func_lister.DOCUMENT_BACKENDS:
+            with self.subTest(backend_name):
+                output = os.path.join(self.temp_dir.name, "out")
+                func_lister.create_document(DESCRIPTIONS, output, backend_name)
+                file_path = output + func_lister.DOCUMENT_BACKENDS[backend_name].extension
+                with open(file_path, "rb") as f:
+                    expected = f.read()
+
+                with self.assertRaises(RuntimeError):
+                    with func_lister.DOCUMENT_BACKENDS[backend_name](output) as backend:
+                        backend.write_section(backend.render_section("partial", func_lister.make_table(DESCRIPTIONS)))
+                        raise RuntimeError
+
+                with open(file_path, "rb") as f:
+                    self.assertEqual(f.read(), expected)
+                # nothing is left behind next to it either.
+                self.assertEqual(os.listdir(self.temp_dir.name), [os.path.basename(file_path)])
+                os.remove(file_path)
+
+if __name__ == "__main__":
+    unittest.main()
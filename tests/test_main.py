@@ -0,0 +1,36 @@
+import os
+import sys
+import unittest
+from itertools import accumulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import main
+
+TEXTS = [
+    "float é; int y = 3;",
+    "int ²x = 1; Éa int",
+    "x = ٣; /* é */ char c = 'é';",
+    "#define Ω(a) (a) // ω\nunsigned ñ = 0x1F;",
+    "",
+]
+
+class LexerTest(unittest.TestCase):
+    def test_tokens_cover_text(self):
+        # the offsets are worked out from the lengths alone, so nothing can be left
+        # out between one match and the next.
+        for text in TEXTS:
+            pieces = main.lexer_pattern.findall(text)
+            self.assertEqual(sum(len(skipped) + len(token) for skipped, token in pieces), len(text), text)
+
+    def test_token_offsets(self):
+        text = TEXTS[0]
+        tokens = main.get_tokens(text)
+        ends = accumulate(len(skipped) + len(token) for skipped, token in tokens)
+        self.assertEqual(
+            [(end - len(token), token) for end, (_, token) in zip(ends, tokens)],
+            [(0, "float"), (9, "int"), (17, "3")]
+        )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import project_crawler
+
+# braces in every branch of an #ifdef/#else, indented and nested, with the
+# branches opening a different number of blocks.
+CONDITIONAL_SOURCE = """\
+int before(void);
+
+  int indented(int a) {
+#ifdef USE_A
+    if (a) {
+#else
+    if (!a) {
+#endif
+        return 1;
+    }
+    return 0;
+  }
+
+int nested(int a) {
+    #if defined(X)
+    while (a) {
+        #ifdef Y
+        if (a > 1) {
+        #elif defined(Z)
+        if (a > 2) {
+        #else
+        switch (a) { default:
+        #endif
+            a--;
+        }
+    #else
+    for (;;) { {
+    #endif
+    }
+    return a;
+}
+
+int after(void) {
+    return 2;
+}
+"""
+
+# a continued macro, one with comments on its continued lines, and two where the
+# backslash is inside a comment and so doesn't continue them.
+MACRO_SOURCE = """\
+#define FIRST(a) \\
+    (a) + \\
+    1
+#define SECOND(a) /* two */ \\
+    (a) /* plus */ + \\
+    2
+#define THIRD(a) (a) /* \\
+    */
+#define FOURTH(a) (a) // \\
+int x;
+"""
+
+# names and spacing outside ASCII, which the str and bytes scanners have to agree
+# on.
+UNICODE_SOURCE = """\
+int café(int a) {
+    return a;
+}
+
+int\u00a0spaced(int b) {
+    return b;
+}
+
+struct naïve { int x; };
+#define ÉTAT(a) (a)
+int plain(void) {
+    return 0;
+}
+"""
+
+class LineIndexTest(unittest.TestCase):
+    def get_spans(self, file_data):
+        return {report.name: (report.start_line, report.num_lines) for report in project_crawler.scan_file("test.c", file_data)}
+
+    def test_conditional_braces(self):
+        self.assertEqual(self.get_spans(CONDITIONAL_SOURCE), {
+            "indented": (2, 10),
+            "nested": (13, 18),
+            "after": (32, 3),
+        })
+
+    def test_macro_continuation(self):
+        self.assertEqual(self.get_spans(MACRO_SOURCE), {
+            "FIRST": (0, 3),
+            "SECOND": (3, 3),
+            "THIRD": (6, 1),
+            "FOURTH": (8, 1),
+        })
+
+    def test_scan_path_matches_scan_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "test.c")
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(UNICODE_SOURCE)
+            reports = project_crawler.scan_path(file_path)[2]
+        self.assertEqual(project_crawler.scan_file(file_path, UNICODE_SOURCE), reports)
+        self.assertEqual([report.name for report in reports], ["plain"])
+
+    def test_mapped_matches_str(self):
+        line_index = project_crawler.LineIndex(CONDITIONAL_SOURCE)
+        mapped_index = project_crawler.LineIndex(CONDITIONAL_SOURCE.encode("utf-8"))
+        self.assertEqual(line_index.block_ends, mapped_index.block_ends)
+        self.assertEqual(
+            [line_index.get_kind(i) for i in range(len(line_index))],
+            [mapped_index.get_kind(i) for i in range(len(mapped_index))]
+        )
+
+    def test_generate_function_report(self):
+        file_lines = CONDITIONAL_SOURCE.split("\n")
+        reports = [project_crawler.generate_function_report("test.c", file_lines, i) for i in range(len(file_lines))]
+        self.assertEqual(
+            [(report.name, report.start_line, report.num_lines) for report in reports if report is not None],
+            [(report.name, report.start_line, report.num_lines) for report in project_crawler.scan_file("test.c", CONDITIONAL_SOURCE)]
+        )
+
+if __name__ == "__main__":
+    unittest.main()